@@ -0,0 +1,40 @@
+"""
+Time of "import ucumvert" and of the first use of its heavy parts.
+
+Each measurement runs in a fresh interpreter. Run with:
+
+    python benchmarks/bench_import.py
+"""
+
+import subprocess
+import sys
+
+STATEMENTS = {
+    "import ucumvert": "import ucumvert",
+    "xml_util.get_prefixes()": "from ucumvert.xml_util import get_prefixes; get_prefixes()",
+    "import ucumvert.ucum_pint": "import ucumvert.ucum_pint",
+}
+
+
+def time_in_fresh_interpreter(statement, repeat=5):
+    code = (
+        "import time; t0 = time.perf_counter(); "
+        f"{statement}; print(time.perf_counter() - t0)"
+    )
+    timings = []
+    for _ in range(repeat):
+        result = subprocess.run(  # noqa: S603
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        timings.append(float(result.stdout))
+    return min(timings)
+
+
+def main():
+    for name, statement in STATEMENTS.items():
+        seconds = time_in_fresh_interpreter(statement)
+        print(f"{name:<28} {seconds * 1e3:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Per-call cost of ucum_preprocessor before and after sharing the parser.
+
+"before" rebuilds the Earley parser and transformer on every call, as the
+former ucum_preprocessor function did. Run with:
+
+    python benchmarks/bench_ucum_preprocessor.py
+"""
+
+import timeit
+
+from ucumvert import UcumToPintStrTransformer
+from ucumvert.parser import get_ucum_parser
+from ucumvert.ucum_pint import UcumPreprocessor
+
+UCUM_CODES = ["mg/dL", "mmol/L", "10*3/uL", "kg/m2", "[in_i]", "m[H2O]{35Cel}"]
+
+
+def preprocessor_before(unit_input):
+    ucum_parser = get_ucum_parser(engine="earley")
+    transformer = UcumToPintStrTransformer()
+    parsed_data = ucum_parser.parse(unit_input)
+    return str(transformer.transform(parsed_data))
+
+
+def time_per_call(fcn, number):
+    def run():
+        for code in UCUM_CODES:
+            fcn(code)
+
+    seconds = min(timeit.repeat(run, number=number, repeat=3))
+    return seconds / (number * len(UCUM_CODES))
+
+
+def main():
+    results = {"before (parser per call)": time_per_call(preprocessor_before, 2)}
+    shared_parser = get_ucum_parser()
+    uncached = UcumPreprocessor(shared_parser, cache_size=0)
+    cached = UcumPreprocessor(shared_parser)
+    results["shared parser, cold cache"] = time_per_call(uncached, 200)
+    results["shared parser, warm cache"] = time_per_call(cached, 2000)
+    for name, seconds in results.items():
+        print(f"{name:<28} {seconds * 1e6:12.1f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Benchmark suite for parser, transformer and registry construction.
+
+Construction and import times are measured in fresh interpreters, all other
+benchmarks as best of several timeit repeats. The results can be written to
+a JSON file and compared with the results of an earlier run, e.g. before and
+after a lark or pint upgrade:
+
+    python benchmarks/run_benchmarks.py --output baseline.json
+    python benchmarks/run_benchmarks.py --compare baseline.json --threshold 0.2
+
+With --compare the exit code is 1 if any benchmark is more than threshold
+(relative) slower than in the baseline.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import timeit
+from importlib.metadata import version
+from pathlib import Path
+
+import ucumvert
+from ucumvert.parser import get_ucum_parser
+from ucumvert.ucum_pint import (
+    PintUcumRegistry,
+    UcumPreprocessor,
+    UcumToPintTransformer,
+)
+
+EXAMPLES_FILE = Path(ucumvert.__file__).parent / "vendor" / "ucum_examples.tsv"
+
+# name: (setup, statement), each timed in a fresh interpreter
+FRESH_INTERPRETER_BENCHMARKS = {
+    "import ucumvert": ("", "import ucumvert"),
+    "get_ucum_parser(engine='earley')": (
+        "from ucumvert.parser import get_ucum_parser",
+        "get_ucum_parser(engine='earley')",
+    ),
+    "get_ucum_parser(engine='lalr')": (
+        "from ucumvert.parser import get_ucum_parser",
+        "get_ucum_parser(engine='lalr')",
+    ),
+    "get_ucum_parser(engine='descent')": (
+        "from ucumvert.parser import get_ucum_parser",
+        "get_ucum_parser(engine='descent')",
+    ),
+    "PintUcumRegistry()": (
+        "from ucumvert import PintUcumRegistry",
+        "PintUcumRegistry()",
+    ),
+    # The first of the repeats fills pint's disk cache.
+    "PintUcumRegistry(cache_folder=':auto:')": (
+        "from ucumvert import PintUcumRegistry",
+        "PintUcumRegistry(cache_folder=':auto:')",
+    ),
+}
+
+
+def read_examples():
+    """Return the UCUM codes of the official examples (without "Torr")."""
+    ucum_codes = []
+    with EXAMPLES_FILE.open(encoding="utf8") as f:
+        for line in f:
+            if line.startswith("Row #"):
+                continue
+            ucum_code = line.split("\t")[1]
+            if ucum_code != "Torr":  # not defined in ucum-essence.xml
+                ucum_codes.append(ucum_code)
+    return ucum_codes
+
+
+def time_in_fresh_interpreter(setup, statement, repeat=5):
+    code = (
+        f"{setup}\nimport time\nt0 = time.perf_counter()\n{statement}\n"
+        "print(time.perf_counter() - t0)"
+    )
+    timings = []
+    for _ in range(repeat):
+        result = subprocess.run(  # noqa: S603
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        timings.append(float(result.stdout))
+    return min(timings)
+
+
+def time_per_code(fcn, ucum_codes, number):
+    """Return the best time per UCUM code of calling fcn for all ucum_codes.
+
+    Codes for which fcn raises (e.g. "[pH]" is not defined in pint) are skipped.
+    """
+    ucum_codes = [ucum_code for ucum_code in ucum_codes if _succeeds(fcn, ucum_code)]
+
+    def run():
+        for ucum_code in ucum_codes:
+            fcn(ucum_code)
+
+    seconds = min(timeit.repeat(run, number=number, repeat=5))
+    return seconds / (number * len(ucum_codes))
+
+
+def _succeeds(fcn, ucum_code):
+    try:
+        fcn(ucum_code)
+    except Exception:  # noqa: BLE001
+        return False
+    return True
+
+
+def in_process_benchmarks(ucum_codes, number):
+    parsers = {engine: get_ucum_parser(engine=engine) for engine in ("earley", "lalr")}
+    descent_parser = get_ucum_parser(engine="descent")
+    ureg = PintUcumRegistry(ucum_cache_size=0)
+    transformer = UcumToPintTransformer(ureg)
+    trees = {ucum_code: parsers["lalr"].parse(ucum_code) for ucum_code in ucum_codes}
+    shared_parser = parsers["lalr"]
+
+    benchmarks = {
+        "parse examples (earley)": (parsers["earley"].parse, max(1, number // 10)),
+        "parse examples (lalr)": (parsers["lalr"].parse, number),
+        "transform examples to pint": (
+            lambda ucum_code: transformer.transform(trees[ucum_code]),
+            number,
+        ),
+        "parse + transform examples (descent)": (
+            lambda ucum_code: descent_parser.transform(ucum_code, transformer),
+            number,
+        ),
+        "from_ucum examples (uncached)": (ureg.from_ucum, number),
+        "ucum_preprocessor (cold cache)": (
+            UcumPreprocessor(shared_parser, cache_size=0),
+            number,
+        ),
+        "ucum_preprocessor (warm cache)": (
+            UcumPreprocessor(shared_parser),
+            10 * number,
+        ),
+    }
+    results = {}
+    for name, (fcn, n) in benchmarks.items():
+        print(f"running {name} ...", file=sys.stderr)
+        results[name] = time_per_code(fcn, ucum_codes, n)
+    return results
+
+
+def run_benchmarks(number=20):
+    """Return a dict with metadata and the benchmark results in seconds."""
+    results = {}
+    for name, (setup, statement) in FRESH_INTERPRETER_BENCHMARKS.items():
+        print(f"running {name} ...", file=sys.stderr)
+        results[name] = time_in_fresh_interpreter(setup, statement)
+    results.update(in_process_benchmarks(read_examples(), number))
+    return {
+        "metadata": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "ucumvert": ucumvert.__version__,
+            "lark": version("lark"),
+            "pint": version("pint"),
+        },
+        "benchmarks": {name: {"seconds": seconds} for name, seconds in results.items()},
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print the ratios to the baseline and return the names of regressions."""
+    regressions = []
+    print(f"{'benchmark':<40} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for name, entry in results["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            print(f"{name:<40} {'-':>12} {entry['seconds']:12.3e}")
+            continue
+        base_seconds = baseline["benchmarks"][name]["seconds"]
+        ratio = entry["seconds"] / base_seconds
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<40} {base_seconds:12.3e} {entry['seconds']:12.3e} "
+            f"{ratio:7.2f}{flag}"
+        )
+    return regressions
+
+
+def print_results(results):
+    for name, entry in results["benchmarks"].items():
+        seconds = entry["seconds"]
+        if seconds < 1e-3:  # noqa: PLR2004
+            print(f"{name:<40} {seconds * 1e6:10.1f} us")
+        else:
+            print(f"{name:<40} {seconds * 1e3:10.1f} ms")
+
+
+def main(raw_args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-o", "--output", type=Path, help="Write results as JSON.")
+    parser.add_argument(
+        "-c", "--compare", type=Path, help="JSON results of a baseline run."
+    )
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed relative slowdown compared to the baseline (default 0.2).",
+    )
+    parser.add_argument(
+        "-n",
+        "--number",
+        type=int,
+        default=20,
+        help="Loops over the examples per timeit repeat (default 20).",
+    )
+    args = parser.parse_args(raw_args)
+
+    results = run_benchmarks(args.number)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+    if not args.compare:
+        print_results(results)
+        return 0
+    baseline = json.loads(args.compare.read_text())
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,42 +1,68 @@
 from __future__ import annotations
 
+import importlib
+import importlib.util
 import logging
 import os
 from pathlib import Path
 
-from ucumvert.parser import (
-    get_ucum_parser,
-    update_lark_ucum_grammar_file,
-)
-from ucumvert.ucum_pint import (
-    PintUcumRegistry,
-    UcumToPintStrTransformer,
-    UcumToPintTransformer,
-    ucum_preprocessor,
-)
-
 try:
     from ucumvert._version import __version__, __version_tuple__
 except ImportError:  # pragma: no cover
     __version__ = "0.0.0"
     __version_tuple__ = (0, 0, 0)
 
-try:  # pragma: no cover
-    import pydot  # noqa: F401
-
-    HAS_PYDOT = True
-except ImportError:  # pragma: no cover
-    HAS_PYDOT = False
+# Check without importing, to keep "import ucumvert" cheap.
+HAS_PYDOT = importlib.util.find_spec("pydot") is not None
 
 __all__ = [
+    "AsyncUcumRegistry",
     "PintUcumRegistry",
+    "UcumPreprocessor",
+    "UcumStats",
     "UcumToPintStrTransformer",
     "UcumToPintTransformer",
+    "UcumUnit",
+    "base_unit_form",
+    "canonical_form",
     "get_ucum_parser",
+    "ucum_case_insensitive_to_cs",
     "ucum_preprocessor",
     "update_lark_ucum_grammar_file",
 ]
 
+# The public API is imported on first access (PEP 562), so that "import ucumvert"
+# does not import lark and pint or parse the UCUM definitions.
+_LAZY_IMPORTS = {
+    "AsyncUcumRegistry": "ucumvert.async_registry",
+    "UcumUnit": "ucumvert.canonical",
+    "base_unit_form": "ucumvert.canonical",
+    "canonical_form": "ucumvert.canonical",
+    "get_ucum_parser": "ucumvert.parser",
+    "ucum_case_insensitive_to_cs": "ucumvert.parser",
+    "update_lark_ucum_grammar_file": "ucumvert.parser",
+    "PintUcumRegistry": "ucumvert.ucum_pint",
+    "UcumPreprocessor": "ucumvert.ucum_pint",
+    "UcumStats": "ucumvert.stats",
+    "UcumToPintStrTransformer": "ucumvert.ucum_pint",
+    "UcumToPintTransformer": "ucumvert.ucum_pint",
+    "ucum_preprocessor": "ucumvert.ucum_pint",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name]), name)
+        globals()[name] = value
+        return value
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
 # Note that nothing is passed to getLogger to set the "root" logger
 logger = logging.getLogger()
 
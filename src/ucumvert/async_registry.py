@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+
+from lark.exceptions import LarkError
+
+from ucumvert.ucum_pint import (
+    PintUcumRegistry,
+    UcumBatchResult,
+    _copy_exception,
+    ucum_code_type_error,
+)
+
+
+class AsyncUcumRegistry:
+    """
+    Asyncio facade over a PintUcumRegistry.
+
+    Cached UCUM codes and cached errors are served inline. Other codes are
+    converted in an executor, so that parsing does not block the event loop.
+    Concurrent requests for the same code wait for a single conversion.
+
+    Parameters
+    ----------
+    ureg :
+        Registry to use, by default a new PintUcumRegistry. The registry may
+        be shared with synchronous code, see PintUcumRegistry.from_ucum.
+    executor :
+        concurrent.futures executor for the conversions. None (default) uses
+        the default executor of the event loop.
+    """
+
+    def __init__(self, ureg: PintUcumRegistry | None = None, executor=None):
+        self.ureg = PintUcumRegistry() if ureg is None else ureg
+        self.executor = executor
+        self._pending = {}  # ucum_code -> future of a running conversion
+
+    async def from_ucum(self, ucum_code):
+        """Transform an ucum_code to a pint unit, see PintUcumRegistry.from_ucum."""
+        # Cached results and errors are served inline, counted in ucum_stats.
+        quantity = self.ureg._from_ucum_cached(ucum_code)  # noqa: SLF001
+        if quantity is not None:
+            return copy.copy(quantity)
+        try:
+            quantity = await self._convert(ucum_code)
+        except LarkError as exc:
+            # Coalesced requests share the exception of the executor's future,
+            # so each raises its own copy (outside of this handler, so that
+            # the shared exception is not chained as __context__).
+            error = _copy_exception(exc)
+        else:
+            return copy.copy(quantity)
+        raise error
+
+    async def from_ucum_many(self, ucum_codes) -> UcumBatchResult:
+        """Transform many UCUM codes concurrently without raising on bad codes.
+
+        See PintUcumRegistry.from_ucum_many for the result.
+        """
+        ucum_codes = list(ucum_codes)
+        distinct = list(dict.fromkeys(ucum_codes))
+        results = await asyncio.gather(*(self._from_ucum_or_error(c) for c in distinct))
+        converted = dict(zip(distinct, results))
+        results = [converted[ucum_code] for ucum_code in ucum_codes]
+        return UcumBatchResult(
+            quantities=[quantity for quantity, _ in results],
+            errors=[error for _, error in results],
+        )
+
+    async def _from_ucum_or_error(self, ucum_code):
+        error = ucum_code_type_error(ucum_code)
+        if error is not None:
+            return None, error
+        try:
+            return await self.from_ucum(ucum_code), None
+        except LarkError as exc:  # parser errors and wrapped pint errors
+            return None, exc
+
+    async def _convert(self, ucum_code):
+        future = self._pending.get(ucum_code)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self.executor,
+                self.ureg._from_ucum_uncached,  # noqa: SLF001
+                ucum_code,
+            )
+            self._pending[ucum_code] = future
+            future.add_done_callback(lambda _: self._pending.pop(ucum_code, None))
+        # shield: a cancelled waiter must not cancel the conversion of the others
+        return await asyncio.shield(future)
@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import functools
+import json
+import logging
+import sys
+import weakref
+from fractions import Fraction
+from pathlib import Path
+from typing import NamedTuple
+
+from lark import Transformer
+
+from ucumvert.xml_util import (
+    get_base_units,
+    get_prefix_values,
+    get_units_with_full_definition,
+)
+
+logger = logging.getLogger(__name__)
+
+# Created by update_base_unit_table_file from ucum-essence.xml
+BASE_UNIT_TABLE_FILE = Path(__file__).resolve().parent / "ucum_base_units.json"
+
+_ONE = (Fraction(1), {})
+
+
+class CanonicalUnit(NamedTuple):
+    """
+    Hashable normal form of a UCUM code.
+
+    factor is the product of all numeric factors (e.g. 1/1000 for "/1000.m"),
+    atoms is a sorted tuple of (prefix, unit atom, exponent) with zero
+    exponents removed. Annotations are dropped. "m/s", "m.s-1" and
+    "s-1.m{x}" have the same canonical form.
+    """
+
+    factor: Fraction
+    atoms: tuple
+
+    def to_ucum(self) -> str:
+        """Return the canonical form as UCUM code, e.g. "5.m.s-1/18"."""
+        parts = [f"{p}{a}{e if e != 1 else ''}" for p, a, e in self.atoms]
+        if self.factor.numerator != 1 or not parts:
+            parts.insert(0, str(self.factor.numerator))
+        ucum_code = ".".join(parts)
+        if self.factor.denominator != 1:
+            ucum_code += f"/{self.factor.denominator}"
+        return ucum_code
+
+
+class BaseUnitForm(NamedTuple):
+    """
+    UCUM code reduced to the UCUM base units.
+
+    factor is the exact factor to the product of the base units, dimensions
+    is a sorted tuple of (base unit, exponent), e.g. "km/h" ->
+    BaseUnitForm(Fraction(5, 18), (("m", 1), ("s", -1))). Special units (e.g.
+    "Cel", "[pH]") and arbitrary units (e.g. "[iU]") are not reducible and
+    appear as dimensions of their own.
+    """
+
+    factor: Fraction
+    dimensions: tuple
+
+
+def _multiply(left, right, exponent=1):
+    factor = left[0] * right[0] ** exponent
+    atoms = dict(left[1])
+    for key, e in right[1].items():
+        atoms[key] = atoms.get(key, 0) + exponent * e
+    return factor, atoms
+
+
+def _value(arg):
+    # An annotation without a unit (lark Token) is equivalent to unity.
+    return arg if isinstance(arg, tuple) else _ONE
+
+
+class UcumToCanonicalTransformer(Transformer):
+    """
+    Transform a parsed UCUM code to (factor, {(prefix, atom): exponent}).
+
+    Use canonical_form() for a CanonicalUnit of a UCUM code. The transformer
+    does not need pint and can also be used with UcumDescentParser.transform.
+    """
+
+    def main_term(self, args):
+        if len(args) == 2:  # unary DIVIDE  # noqa: PLR2004
+            return _multiply(_ONE, _value(args[1]), -1)
+        return _value(args[0])
+
+    def term(self, args):
+        sign = 1 if args[1] == "." else -1
+        return _multiply(_value(args[0]), _value(args[2]), sign)
+
+    def component(self, args):
+        return _value(args[0])  # ignore annotations
+
+    def simple_unit(self, args):
+        if len(args) == 2:  # prefix is present  # noqa: PLR2004
+            return Fraction(1), {
+                (sys.intern(str(args[0])), sys.intern(str(args[1]))): 1
+            }
+        if args[0].isdigit():  # FACTOR
+            return Fraction(int(args[0])), {}
+        return Fraction(1), {("", sys.intern(str(args[0]))): 1}
+
+    def annotatable(self, args):
+        factor, atoms = _value(args[0])
+        exponent = int(args[1])
+        return factor**exponent, {key: e * exponent for key, e in atoms.items()}
+
+
+def _parse(ucum_code: str, parser=None):
+    if parser is None:
+        from ucumvert.parser import get_shared_ucum_parser  # noqa: PLC0415
+
+        parser = get_shared_ucum_parser("descent")
+    return parser.transform(ucum_code, UcumToCanonicalTransformer())
+
+
+@functools.lru_cache(maxsize=4096)
+def canonical_form(ucum_code: str) -> CanonicalUnit:
+    """
+    Return the canonical form of a UCUM code, computed without pint.
+
+    Codes with equal canonical forms denote the same unit, e.g.
+    canonical_form("m/s") == canonical_form("m.s-1"). Invalid codes raise
+    the lark exceptions of the parser.
+    """
+    factor, atoms = _parse(ucum_code)
+    return CanonicalUnit(
+        factor, tuple(sorted((p, a, e) for (p, a), e in atoms.items() if e))
+    )
+
+
+@functools.cache
+def _get_unit_definitions() -> dict:
+    return {u.code_cs: u for u in get_units_with_full_definition()}
+
+
+def _derive_atom(atom: str, parser, derived: dict) -> tuple:
+    """Reduce a unit atom to (factor, {base unit: exponent}) via ucum-essence.xml.
+
+    The defining units are parsed with parser, derived caches the results.
+    """
+    if atom in derived:
+        return derived[atom]
+    unit = _get_unit_definitions().get(atom)
+    if (
+        atom in get_base_units()
+        or unit.is_special
+        or (unit.is_arbitrary and unit.defining_unit == "1")
+    ):
+        # Not reducible: special units are non-linear, e.g. "Cel" or "[pH]".
+        result = (Fraction(1), {atom: 1})
+    else:
+        factor, atoms = _parse(unit.defining_unit, parser)
+        result = (factor * Fraction(unit.conversion_factor), {})
+        for (prefix, a), exponent in atoms.items():
+            prefix_factor = Fraction(get_prefix_values()[prefix]) if prefix else 1
+            reduced = _multiply((prefix_factor, {}), _derive_atom(a, parser, derived))
+            result = _multiply(result, reduced, exponent)
+    derived[atom] = result
+    return result
+
+
+def build_base_unit_table(grammar_file: Path | None = None) -> dict:
+    """
+    Reduce all UCUM prefixes and unit atoms to the UCUM base units.
+
+    The factors are exact fractions as strings, the dimensions are lists of
+    [base unit, exponent]. Special units are listed separately, they are
+    their own dimension and their factor is meaningless. The definitions are
+    parsed with the grammar_file (default is the shipped grammar), which must
+    match ucum-essence.xml.
+    """
+    from ucumvert.parser import get_ucum_parser  # noqa: PLC0415
+
+    parser = get_ucum_parser(grammar_file, engine="descent")
+    derived = {}
+    units = {}
+    for atom in get_base_units() + list(_get_unit_definitions()):
+        factor, dimensions = _derive_atom(atom, parser, derived)
+        units[atom] = [str(factor), sorted([b, e] for b, e in dimensions.items())]
+    return {
+        "prefixes": {p: str(Fraction(v)) for p, v in get_prefix_values().items()},
+        "units": units,
+        "special": [
+            u.code_cs for u in _get_unit_definitions().values() if u.is_special
+        ],
+    }
+
+
+def update_base_unit_table_file(
+    table_file: Path | None = None, grammar_file: Path | None = None
+) -> None:
+    """Write the table of build_base_unit_table() as JSON (one atom per line)."""
+    if table_file is None:
+        table_file = BASE_UNIT_TABLE_FILE
+    table = build_base_unit_table(grammar_file)
+    lines = []
+    for key, entries in table.items():
+        if isinstance(entries, dict):
+            items = [
+                f"    {json.dumps(k)}: {json.dumps(v)}" for k, v in entries.items()
+            ]
+            lines.append(f'  "{key}": {{\n' + ",\n".join(items) + "\n  }")
+        else:
+            lines.append(f'  "{key}": {json.dumps(entries)}')
+    with table_file.open("w", encoding="utf8") as f:
+        f.write("{\n" + ",\n".join(lines) + "\n}\n")
+    logger.info("Updated base unit table written to '%s'.", table_file)
+
+
+@functools.cache
+def _get_base_unit_table() -> tuple:
+    with BASE_UNIT_TABLE_FILE.open(encoding="utf8") as f:
+        table = json.load(f)
+    prefixes = {p: Fraction(v) for p, v in table["prefixes"].items()}
+    units = {
+        atom: (Fraction(factor), dict(dimensions))
+        for atom, (factor, dimensions) in table["units"].items()
+    }
+    return prefixes, units, frozenset(table["special"])
+
+
+@functools.cache
+def _reduce_atom(prefix: str, atom: str) -> tuple:
+    """Return (factor, {base unit: exponent}) for a prefixed unit atom."""
+    prefixes, units, special = _get_base_unit_table()
+    if atom in special:
+        return Fraction(1), {prefix + atom: 1}
+    factor, dimensions = units[atom]
+    return (prefixes[prefix] * factor if prefix else factor), dimensions
+
+
+@functools.lru_cache(maxsize=4096)
+def base_unit_form(ucum_code: str) -> BaseUnitForm:
+    """
+    Return the UCUM code reduced to UCUM base units, computed without pint.
+
+    Codes with equal dimensions are commensurable. The ratio of the factors
+    is the conversion factor, e.g. for "km/h" to "m/s" it is 5/18. Only
+    case-sensitive codes are supported.
+    """
+    canonical = canonical_form(ucum_code)
+    result = (canonical.factor, {})
+    for prefix, atom, exponent in canonical.atoms:
+        result = _multiply(result, _reduce_atom(prefix, atom), exponent)
+    factor, dimensions = result
+    return BaseUnitForm(
+        factor, tuple(sorted((b, e) for b, e in dimensions.items() if e))
+    )
+
+
+def conversion_factor(source: str, target: str) -> Fraction:
+    """
+    Return the exact factor to convert values from source to target UCUM code.
+
+    Computed by arithmetic on the precomputed base unit table, without pint.
+    Raises ValueError for codes that are not commensurable or that contain
+    special (non-linear) units like "Cel" or "[pH]".
+    """
+    special = _get_base_unit_table()[2]
+    for ucum_code in (source, target):
+        if any(atom in special for _, atom, _ in canonical_form(ucum_code).atoms):
+            msg = f"UCUM code {ucum_code!r} contains a special (non-linear) unit."
+            raise ValueError(msg)
+    source_form, target_form = base_unit_form(source), base_unit_form(target)
+    if source_form.dimensions != target_form.dimensions:
+        msg = f"UCUM codes {source!r} and {target!r} are not commensurable."
+        raise ValueError(msg)
+    return source_form.factor / target_form.factor
+
+
+_interned_units = weakref.WeakValueDictionary()
+
+
+class UcumUnit:
+    """
+    Compact, immutable and interned parsed UCUM unit.
+
+    UcumUnit("mg/dL") parses the code on first use and returns the same
+    instance for the same code as long as it is referenced, so millions of
+    records with a few distinct units hold only references. Units compare and
+    hash by their canonical form, i.e. UcumUnit("m/s") == UcumUnit("m.s-1").
+    Invalid codes raise the lark exceptions of the parser.
+    """
+
+    __slots__ = ("__weakref__", "canonical", "code")
+
+    def __new__(cls, ucum_code: str):
+        unit = _interned_units.get(ucum_code)
+        if unit is None:
+            unit = super().__new__(cls)
+            object.__setattr__(unit, "canonical", canonical_form(ucum_code))
+            object.__setattr__(unit, "code", sys.intern(ucum_code))
+            unit = _interned_units.setdefault(unit.code, unit)
+        return unit
+
+    def __setattr__(self, name, value):
+        msg = f"{self.__class__.__name__} is immutable."
+        raise AttributeError(msg)
+
+    def __delattr__(self, name):
+        msg = f"{self.__class__.__name__} is immutable."
+        raise AttributeError(msg)
+
+    def __eq__(self, other):
+        if not isinstance(other, UcumUnit):
+            return NotImplemented
+        return self.canonical == other.canonical
+
+    def __hash__(self):
+        return hash(self.canonical)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.code!r})"
+
+    def __str__(self):
+        return self.code
+
+    def __reduce__(self):
+        return self.__class__, (self.code,)  # unpickled units are interned too
+
+    @property
+    def base_unit_form(self) -> BaseUnitForm:
+        return base_unit_form(self.code)
+
+    def to_pint(self, ureg):
+        """Return the unit as pint quantity of ureg (a PintUcumRegistry)."""
+        return ureg.from_ucum(self.code)
@@ -1,18 +1,27 @@
 import argparse
+import csv
+import json
 import logging
 import sys
 import textwrap
+import time
 from pathlib import Path
 
 from lark import tree
 from lark.exceptions import LarkError, UnexpectedInput, VisitError
 
 import ucumvert
+from ucumvert.cache import LRUCache
+from ucumvert.canonical import canonical_form
 from ucumvert.parser import (
     get_ucum_parser,
     update_lark_ucum_grammar_file,
 )
-from ucumvert.ucum_pint import UcumToPintTransformer, find_matching_pint_definitions
+from ucumvert.ucum_pint import (
+    PintUcumRegistry,
+    UcumToPintTransformer,
+    find_matching_pint_definitions,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +56,124 @@ def interactive():
             continue
 
 
+# ===  streaming convert/validate commands  ===
+
+CONVERT_FIELDS = ("ucum_code", "pint", "canonical", "error")
+VALIDATE_FIELDS = ("ucum_code", "valid", "canonical", "error")
+
+
+def read_ucum_codes(lines, column=None, delimiter=","):
+    """
+    Yield UCUM codes from an iterable of lines, one code per line.
+
+    If column is given, the lines are read as CSV/TSV with a header line and
+    the codes are taken from the column with this name or 1-based number.
+    """
+    if column is None:
+        for line in lines:
+            yield line.strip()
+        return
+    reader = csv.reader(lines, delimiter=delimiter)
+    header = next(reader, [])
+    if column.isdigit():
+        index = int(column) - 1
+        if index < 0:
+            msg = f"Column numbers start at 1, got {column!r}."
+            raise ValueError(msg)
+    elif column in header:
+        index = header.index(column)
+    else:
+        msg = f"Column {column!r} not found in header {header!r}."
+        raise ValueError(msg)
+    for row in reader:
+        yield row[index].strip() if index < len(row) else ""
+
+
+def _error_message(exc) -> str:
+    return " ".join(str(exc).split())  # single line without repeated whitespace
+
+
+def _convert_record(ucum_code, ureg):
+    try:
+        quantity = ureg.from_ucum(ucum_code)
+        canonical = canonical_form(ucum_code).to_ucum()
+    except LarkError as exc:
+        return {"ucum_code": ucum_code, "error": _error_message(exc)}
+    if not isinstance(quantity, ureg.Quantity):
+        pint = "1"  # annotation-only code, e.g. "{rbc}"
+    elif quantity.magnitude == 1:
+        pint = str(quantity.units)
+    else:
+        pint = str(quantity)
+    return {"ucum_code": ucum_code, "pint": pint, "canonical": canonical}
+
+
+def _validate_record(ucum_code):
+    try:
+        canonical = canonical_form(ucum_code).to_ucum()
+    except LarkError as exc:
+        return {"ucum_code": ucum_code, "valid": False, "error": _error_message(exc)}
+    return {"ucum_code": ucum_code, "valid": True, "canonical": canonical}
+
+
+def stream_records(ucum_codes, make_record, cache_size=65536):
+    """
+    Yield make_record(code) for each code, computing each distinct code once.
+
+    Only the records of the last cache_size distinct codes are kept, so
+    arbitrarily long inputs are processed with bounded memory.
+    """
+    cache = LRUCache(cache_size)
+    for ucum_code in ucum_codes:
+        record = cache.get(ucum_code)
+        if record is None:
+            record = cache[ucum_code] = make_record(ucum_code)
+        yield record
+
+
+def write_records(records, fields, out, fmt="tsv") -> int:
+    """
+    Write records as TSV with header line or as JSON Lines to out.
+
+    Returns the number of records written.
+    """
+    if fmt == "tsv":
+        out.write("\t".join(fields) + "\n")
+    n_records = 0
+    for n_records, record in enumerate(records, 1):  # noqa: B007
+        if fmt == "tsv":
+            values = (record.get(field, "") for field in fields)
+            out.write("\t".join(str(value) for value in values) + "\n")
+        else:
+            out.write(json.dumps({f: record.get(f) for f in fields}) + "\n")
+    return n_records
+
+
+def stream_cmds(args):
+    if args.command == "convert":
+        ureg = PintUcumRegistry(ucum_engine="descent")
+        fields = CONVERT_FIELDS
+
+        def make_record(ucum_code):
+            return _convert_record(ucum_code, ureg)
+
+    else:
+        fields = VALIDATE_FIELDS
+        make_record = _validate_record
+
+    start = time.perf_counter()
+    with args.input as lines:
+        ucum_codes = read_ucum_codes(lines, args.column, args.delimiter)
+        records = stream_records(ucum_codes, make_record, args.cache_size)
+        n_codes = write_records(records, fields, sys.stdout, args.format)
+    elapsed = time.perf_counter() - start
+    rate = n_codes / elapsed if elapsed else float("inf")
+    print(
+        f"Processed {n_codes} UCUM codes in {elapsed:.3f} s ({rate:.0f} codes/s).",
+        file=sys.stderr,
+    )
+
+
 # ===  argparse-cli-related code  ===
 
 
@@ -87,7 +214,11 @@ def root_cmds(args):
     if args.interactive:
         interactive()
     if args.mapping_report:
-        find_matching_pint_definitions(report_file=args.mapping_report)
+        find_matching_pint_definitions(
+            report_file=args.mapping_report,
+            max_workers=args.jobs or None,
+            incremental=args.incremental,
+        )
     if args.grammar_update:
         update_lark_ucum_grammar_file(grammar_file=args.grammar_update)
 
@@ -116,7 +247,9 @@ def create_root_parser():
         "--grammar_update",
         help=(
             "Create grammar file with UCUM atoms extracted from ucum-essence.xml. "
-            "Default is to write to 'ucum_grammar.lark' in the current directory."
+            "Default is to write to 'ucum_grammar.lark' in the current directory. "
+            "The table of base unit factors 'ucum_base_units.json' is written "
+            "to the same directory."
         ),
         type=Path,
         metavar=("FILE"),
@@ -136,10 +269,77 @@ def create_root_parser():
         nargs="?",  # make file an optional argument
         const=Path("pint_ucum_defs_mapping_report.txt"),  # default value
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help=(
+            "Number of worker processes for --mapping_report, 0 for one per CPU. "
+            "Default is 1."
+        ),
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--incremental",
+        help=(
+            "Recompute only the --mapping_report entries whose inputs changed. "
+            "The computed entries are kept in a JSON file next to the report."
+        ),
+        action="store_true",
+    )
     parser.set_defaults(func=root_cmds)
+
+    subparsers = parser.add_subparsers(dest="command", title="commands")
+    for command, help_ in (
+        ("convert", "Convert UCUM codes to pint expressions and canonical form."),
+        ("validate", "Check UCUM codes and report their canonical form."),
+    ):
+        subparser = subparsers.add_parser(
+            command, help=help_, description=help_, formatter_class=DecentFormatter
+        )
+        add_stream_arguments(subparser)
+        subparser.set_defaults(func=stream_cmds)
     return parser
 
 
+def add_stream_arguments(parser):
+    parser.add_argument(
+        "input",
+        help="File with UCUM codes, one per line. Default is to read from stdin.",
+        type=argparse.FileType("r", encoding="utf8"),
+        nargs="?",
+        default="-",
+    )
+    parser.add_argument(
+        "-c",
+        "--column",
+        help=(
+            "Read the input as CSV/TSV file with header line and take the codes "
+            "from the column with this name or 1-based number."
+        ),
+    )
+    parser.add_argument(
+        "-d",
+        "--delimiter",
+        help="Column delimiter for --column. Default is ','.",
+        default=",",
+        type=lambda s: s.encode().decode("unicode_escape"),  # allow "\t"
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        help="Output format written to stdout. Default is 'tsv'.",
+        choices=["tsv", "jsonl"],
+        default="tsv",
+    )
+    parser.add_argument(
+        "--cache_size",
+        help="Number of distinct UCUM codes whose results are kept. Default 65536.",
+        type=int,
+        default=65536,
+    )
+
+
 def main_cli(raw_args=None):
     """Setup CLI app and run commands based on arguments."""
     # Create root parser for cli app
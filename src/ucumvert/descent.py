@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from lark import Token
+
+from ucumvert.lexer import ANNOTATION_CHARS, DIGITS, NON_ZERO_DIGITS, UcumTokenizer
+from ucumvert.parser import UcumParser, get_atom_table
+
+
+class _Rejected(Exception):  # noqa: N818
+    """Input not accepted by the recursive-descent parser."""
+
+
+class UcumDescentParser:
+    """
+    Single-pass recursive-descent UCUM parser that builds no lark trees.
+
+    transform() calls the rule methods of a lark Transformer (e.g.
+    UcumToPintTransformer) directly while parsing, in the same way as lark
+    would call them for the tree of the LALR/Earley parser (rules with "?" in
+    the grammar only for more than one child). Atoms are found with the trie
+    of UcumTokenizer, only annotations are passed as lark Tokens.
+
+    Input rejected by this parser, and errors raised by the transformer, are
+    handled by parsing and transforming the input again with the lark-based
+    UcumParser. This reports errors exactly as the lark path does.
+    """
+
+    def __init__(self, ucum_grammar: str, *, cache: bool | str | Path = False):
+        self.ucum_grammar = ucum_grammar
+        self.tokenizer = UcumTokenizer(get_atom_table(ucum_grammar))
+        self._cache = cache
+        self._lark_parser = None
+
+    @property
+    def lark_parser(self) -> UcumParser:
+        if self._lark_parser is None:
+            self._lark_parser = UcumParser(self.ucum_grammar, cache=self._cache)
+        return self._lark_parser
+
+    def parse(self, ucum_code: str):
+        """Parse to a lark tree (delegates to the lark-based UcumParser)."""
+        return self.lark_parser.parse(ucum_code)
+
+    def transform(self, ucum_code: str, transformer, *, fallback=True):
+        """
+        Parse ucum_code and return the result of the transformer.
+
+        With fallback=False, input that is rejected by the recursive-descent
+        parser raises ValueError instead of using the lark-based parser.
+        """
+        try:
+            value, pos = self._main_term(ucum_code, 0, transformer)
+        except _Rejected:
+            value, pos = None, None
+        except Exception:  # noqa: BLE001
+            # The lark path raises the error, wrapped in VisitError as usual.
+            return transformer.transform(self.lark_parser.parse(ucum_code))
+        if pos == len(ucum_code):
+            return value
+        if not fallback:
+            msg = f"Invalid UCUM code {ucum_code!r}."
+            raise ValueError(msg)
+        return transformer.transform(self.lark_parser.parse(ucum_code))
+
+    # main_term: DIVIDE term | term
+    def _main_term(self, text, pos, transformer):
+        if text.startswith("/", pos):
+            value, pos = self._term(text, pos + 1, transformer)
+            return transformer.main_term(["/", value]), pos
+        value, pos = self._term(text, pos, transformer)
+        return transformer.main_term([value]), pos
+
+    # ?term: term OPERATOR component | component
+    def _term(self, text, pos, transformer):
+        value, pos = self._component(text, pos, transformer)
+        while pos < len(text) and text[pos] in "./":
+            operator = text[pos]
+            right, pos = self._component(text, pos + 1, transformer)
+            value = transformer.term([value, operator, right])
+        return value, pos
+
+    # ?component: annotatable ANNOTATION | annotatable
+    def _component(self, text, pos, transformer):
+        value, pos = self._annotatable(text, pos, transformer)
+        if text.startswith("{", pos):
+            annotation, pos = self._annotation(text, pos)
+            value = transformer.component([value, annotation])
+        return value, pos
+
+    # ?annotatable: simple_unit EXPONENT | ANNOTATION | simple_unit | "(" main_term ")"
+    def _annotatable(self, text, pos, transformer):
+        if text.startswith("{", pos):
+            return self._annotation(text, pos)
+        if text.startswith("(", pos):
+            value, pos = self._main_term(text, pos + 1, transformer)
+            if not text.startswith(")", pos):
+                raise _Rejected
+            return value, pos + 1
+        value, pos = self._simple_unit(text, pos, transformer)
+        if pos < len(text) and (text[pos] in DIGITS or text[pos] in "+-"):
+            exponent, pos = self._digits(text, pos + (text[pos] in "+-"), pos)
+            value = transformer.annotatable([value, exponent])
+        return value, pos
+
+    # simple_unit: PREFIX? UNIT_METRIC | UNIT_NON_METRIC | FACTOR
+    def _simple_unit(self, text, pos, transformer):
+        atom = self.tokenizer.match_atom(text, pos)
+        if atom is not None:
+            args = [value for _, value in self.tokenizer.atom_table[atom]]
+            return transformer.simple_unit(args), pos + len(atom)
+        factor, pos = self._digits(text, pos, pos)
+        return transformer.simple_unit([factor]), pos
+
+    @staticmethod
+    def _digits(text, pos, start):
+        """Match /[1-9][0-9]*/ at pos and return text[start:end]."""
+        if pos >= len(text) or text[pos] not in NON_ZERO_DIGITS:
+            raise _Rejected
+        end = pos + 1
+        while end < len(text) and text[end] in DIGITS:
+            end += 1
+        return text[start:end], end
+
+    @staticmethod
+    def _annotation(text, pos):
+        end = text.find("}", pos) + 1
+        if not end or not ANNOTATION_CHARS.issuperset(text[pos + 1 : end - 1]):
+            raise _Rejected
+        return Token("ANNOTATION", text[pos:end], pos), end
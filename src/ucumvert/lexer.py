@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from lark import Token
+from lark.exceptions import UnexpectedCharacters
+from lark.lexer import Lexer
+
+# A simple unit ends where an exponent, operator, annotation or ")" starts.
+ATOM_BOUNDARY = frozenset("-+0123456789./{)")
+DIGITS = frozenset("0123456789")
+NON_ZERO_DIGITS = frozenset("123456789")
+# ASCII chars 33-126 without curly braces, see STRING in the grammar
+ANNOTATION_CHARS = frozenset(chr(i) for i in range(33, 127)) - {"{", "}"}
+
+_END = ""  # key marking the end of an atom in the trie
+
+
+class UcumTokenizer:
+    """
+    Hand-written tokenizer for UCUM codes.
+
+    Simple units are matched by a longest-match lookup in a character trie of
+    all unit atoms and prefix + metric atom combinations. The tokens have the
+    same types as the tokens of the Earley parser (ucum_grammar.lark), e.g.
+    "kg/m2" -> PREFIX_SHORT, UNIT_METRIC, OPERATOR, UNIT_METRIC, EXPONENT.
+
+    Parameters
+    ----------
+    atom_table :
+        Mapping of simple unit strings to their (terminal name, value) tokens,
+        see parser.get_atom_table.
+    """
+
+    def __init__(self, atom_table):
+        self.atom_table = atom_table
+        self.trie = {}
+        for atom in atom_table:
+            node = self.trie
+            for char in atom:
+                node = node.setdefault(char, {})
+            node[_END] = atom
+
+    def match_atom(self, text: str, pos: int) -> str | None:
+        """Return the longest atom at pos that is followed by a boundary."""
+        node = self.trie
+        atom = None
+        n_text = len(text)
+        for i in range(pos, n_text):
+            node = node.get(text[i])
+            if node is None:
+                break
+            if _END in node and (i + 1 == n_text or text[i + 1] in ATOM_BOUNDARY):
+                atom = node[_END]
+        return atom
+
+    def tokenize(self, text: str):  # noqa: C901, PLR0912
+        pos = 0
+        n_text = len(text)
+        prev_type = None
+        while pos < n_text:
+            char = text[pos]
+            end = pos + 1
+            if prev_type in ("UNIT_METRIC", "UNIT_NON_METRIC", "FACTOR") and (
+                char in DIGITS or char in "+-"
+            ):
+                if char in "+-":
+                    end += 1
+                if end > n_text or text[end - 1] not in NON_ZERO_DIGITS:
+                    raise UnexpectedCharacters(text, pos, 1, pos + 1)
+                while end < n_text and text[end] in DIGITS:
+                    end += 1
+                type_ = "EXPONENT"
+            elif char == "/":
+                type_ = "DIVIDE" if prev_type in (None, "LPAR") else "OPERATOR"
+            elif char == ".":
+                type_ = "OPERATOR"
+            elif char == "(":
+                type_ = "LPAR"
+            elif char == ")":
+                type_ = "RPAR"
+            elif char == "{":
+                end = text.find("}", pos) + 1
+                if not end or not ANNOTATION_CHARS.issuperset(text[pos + 1 : end - 1]):
+                    raise UnexpectedCharacters(text, pos, 1, pos + 1)
+                type_ = "ANNOTATION"
+            elif atom := self.match_atom(text, pos):  # before FACTOR for "10*"
+                for type_, value in self.atom_table[atom]:
+                    yield Token(type_, value, pos, 1, pos + 1)
+                    pos += len(value)
+                prev_type = type_
+                continue
+            elif char in NON_ZERO_DIGITS:
+                while end < n_text and text[end] in DIGITS:
+                    end += 1
+                type_ = "FACTOR"
+            else:
+                raise UnexpectedCharacters(text, pos, 1, pos + 1)
+            yield Token(type_, text[pos:end], pos, 1, pos + 1)
+            prev_type = type_
+            pos = end
+
+
+class UcumLexer(Lexer):
+    """
+    Lark lexer based on UcumTokenizer, for use with the LALR grammar variant.
+
+    The atom table is taken from the UcumAtomSplitter post-lexer, because
+    lark passes only the lexer configuration to a custom lexer, also when the
+    parser is loaded from cache. The splitter has nothing left to split.
+    """
+
+    def __init__(self, lexer_conf):
+        self.tokenizer = UcumTokenizer(lexer_conf.postlex.atom_table)
+
+    def lex(self, data):  # lark interface 0 for custom lexers
+        return self.tokenizer.tokenize(data)
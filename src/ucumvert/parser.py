@@ -1,17 +1,27 @@
 from __future__ import annotations
 
+import contextlib
+import functools
+import hashlib
+import json
 import logging
+import os
+import re
 import textwrap
 from pathlib import Path
 
-from lark import Lark, Transformer
+import lark
+from lark import Lark, Token, Transformer
+from lark.exceptions import UnexpectedInput
 
 import ucumvert
+from ucumvert.lexer import DIGITS, UcumLexer, UcumTokenizer
 from ucumvert.xml_util import (
     get_base_units,
     get_metric_units,
     get_non_metric_units,
     get_prefixes,
+    get_units_with_full_definition,
 )
 
 logger = logging.getLogger(__name__)
@@ -126,28 +136,98 @@ UCUM_GRAMMAR = """
 """
 
 
+# The grammar above is ambiguous and therefore requires lark's Earley parser. For
+# the LALR variant below the ambiguities are resolved as follows:
+# - The alternatives "(" term ")" and "(" component ")" are dropped. They only
+#   duplicate "(" main_term ")", which is also what the Earley parser picks.
+# - Prefixes and unit atoms are not lexed separately, because a lexer cannot
+#   decide whether "m" is a prefix or a unit (e.g. "mol", "dar", "cd", "Pa").
+#   A single ATOM terminal matches a complete simple unit instead, and
+#   UcumAtomSplitter replaces it by the PREFIX_*/UNIT_* tokens of the Earley grammar.
+#   Thus both parsers produce identical trees. By default the lark lexer is replaced
+#   by the hand-written UcumLexer (lexer.py), which finds the simple units with a
+#   longest-match trie instead of the ATOM regex.
+
+UCUM_GRAMMAR_LALR = """
+    main_term: DIVIDE term
+            | term
+    ?term: term OPERATOR component
+            | component
+    ?component: annotatable ANNOTATION
+            | annotatable
+    ?annotatable: simple_unit EXPONENT
+            | ANNOTATION
+            | simple_unit
+            | "(" main_term ")"
+    simple_unit: UNIT_METRIC
+            | PREFIX_SHORT UNIT_METRIC
+            | PREFIX_LONG UNIT_METRIC
+            | UNIT_NON_METRIC
+            | FACTOR
+
+    ANNOTATION: "{{" STRING "}}"
+    STRING: /[!-z|~]*/  # ASCII chars 33-126 without curly braces
+
+    OPERATOR: "." | DIVIDE
+    DIVIDE: "/"
+
+    %declare PREFIX_SHORT PREFIX_LONG UNIT_METRIC UNIT_NON_METRIC
+    # A simple unit ends where an exponent, operator, annotation or ")" starts.
+    # Higher priority than FACTOR, so that "10*" is not lexed as FACTOR "10".
+    ATOM.2: /(?:{atom_alternatives})(?=[-+0-9.\\/{{)]|$)/
+
+    EXPONENT : ["+"|"-"] NON_ZERO_DIGITS
+    FACTOR: NON_ZERO_DIGITS
+    NON_ZERO_DIGITS : /[1-9][0-9]*/  # positive integers > 0
+"""
+
+ATOM_TERMINALS = ("PREFIX_SHORT", "PREFIX_LONG", "UNIT_METRIC", "UNIT_NON_METRIC")
+
+# Shipped files created by update_lark_ucum_grammar_file from ucum-essence.xml
+GRAMMAR_FILE = Path(__file__).resolve().parent / "ucum_grammar.lark"
+GRAMMAR_FILE_CI = GRAMMAR_FILE.with_name("ucum_grammar_ci.lark")
+CI_TO_CS_TABLE_FILE = GRAMMAR_FILE.with_name("ucum_ci_to_cs.json")
+
+
 class UnitsTransformer(Transformer):
     pass
 
 
 def update_lark_ucum_grammar_file(
-    ucum_grammar_template: str = UCUM_GRAMMAR, grammar_file: Path | None = None
+    ucum_grammar_template: str = UCUM_GRAMMAR,
+    grammar_file: Path | None = None,
+    *,
+    case_sensitive: bool | None = None,
 ):
     """
     Update the lark grammar file with UCUM units and prefixes from ucum-essence.xml
+
+    With case_sensitive=True the grammar is created for the case-sensitive
+    UCUM codes ("Code" attribute), with False for the case-insensitive codes
+    ("CODE" attribute). The default is case-sensitive if no grammar_file is
+    given and xml_util.CODE_ATTRIB otherwise. The default grammar_file is the
+    shipped ucum_grammar.lark or ucum_grammar_ci.lark, respectively.
+
+    For case-sensitive grammars the table of base unit factors
+    (ucum_base_units.json) is written next to the grammar file, for
+    case-insensitive grammars the case-insensitive to case-sensitive lookup
+    table (ucum_ci_to_cs.json).
     """
+    if case_sensitive is None:
+        case_sensitive = grammar_file is None or ucumvert.xml_util.CODE_ATTRIB == "Code"
+    code_attrib = "Code" if case_sensitive else "CODE"
     if grammar_file is None:
-        # case sensitive ucum_grammar.lark is the default
-        ucumvert.xml_util.CODE_ATTRIB = "Code"
-        grammar_file = Path(__file__).resolve().parent / "ucum_grammar.lark"
+        grammar_file = GRAMMAR_FILE if case_sensitive else GRAMMAR_FILE_CI
 
-    prefixes = get_prefixes()
+    prefixes = get_prefixes(code_attrib)
     short_prefixes = [i for i in prefixes if len(i) == 1]
     long_prefixes = [i for i in prefixes if len(i) > 1]
     short_prefix_atoms = " |".join(f'"{i}"' for i in short_prefixes)
     long_prefix_atoms = " |".join(f'"{i}"' for i in long_prefixes)
-    metric_atoms = " |".join(f'"{i}"' for i in (get_base_units() + get_metric_units()))
-    non_metric_atoms = " |".join(f'"{i}"' for i in get_non_metric_units())
+    metric_atoms = " |".join(
+        f'"{i}"' for i in (get_base_units(code_attrib) + get_metric_units(code_attrib))
+    )
+    non_metric_atoms = " |".join(f'"{i}"' for i in get_non_metric_units(code_attrib))
 
     ucum_grammar = ucum_grammar_template.format(
         short_prefix_atoms=short_prefix_atoms,
@@ -172,10 +252,325 @@ def update_lark_ucum_grammar_file(
         f.write("\n")  # newline at end of file
     logger.info("Updated grammar written to '%s'.", grammar_file)
 
+    if not case_sensitive:
+        update_ci_to_cs_table_file(grammar_file.with_name(CI_TO_CS_TABLE_FILE.name))
+        return
+    # The table of base unit factors is only available for case-sensitive codes.
+    from ucumvert.canonical import (  # noqa: PLC0415
+        BASE_UNIT_TABLE_FILE,
+        update_base_unit_table_file,
+    )
+
+    # Parse the definitions with the new grammar, not the shipped one.
+    update_base_unit_table_file(
+        grammar_file.with_name(BASE_UNIT_TABLE_FILE.name), grammar_file
+    )
+
+
+def build_ci_to_cs_table() -> dict:
+    """
+    Map the case-insensitive UCUM prefixes and unit atoms to case-sensitive ones.
+
+    Units are split into "metric" (including base units) and "non_metric",
+    because only metric units may be prefixed. Where UCUM defines several
+    case-sensitive atoms with the same case-insensitive code (e.g. "l" and
+    "L" are both "L"), the one that equals the upper-cased code is used.
+    """
+    prefixes = dict(zip(get_prefixes("CODE"), get_prefixes("Code")))
+    metric = dict(zip(get_base_units("CODE"), get_base_units("Code")))
+    non_metric = {}
+    for unit in get_units_with_full_definition("CODE"):
+        table = metric if unit.is_metric else non_metric
+        if table.get(unit.code_ci) != unit.code_ci:
+            table[unit.code_ci] = unit.code_cs
+    return {"prefixes": prefixes, "metric": metric, "non_metric": non_metric}
+
+
+def update_ci_to_cs_table_file(table_file: Path | None = None) -> None:
+    """Write the table of build_ci_to_cs_table() as JSON."""
+    if table_file is None:
+        table_file = CI_TO_CS_TABLE_FILE
+    with table_file.open("w", encoding="utf8") as f:
+        json.dump(build_ci_to_cs_table(), f, indent=1)
+        f.write("\n")
+    logger.info("Updated case-insensitive lookup table written to '%s'.", table_file)
+
+
+@functools.cache
+def _get_ci_to_cs_lookup() -> tuple[dict[str, str], UcumTokenizer]:
+    """Return {upper-case simple unit: case-sensitive simple unit} and its trie."""
+    with CI_TO_CS_TABLE_FILE.open(encoding="utf8") as f:
+        table = json.load(f)
+    lookup = {}
+    for prefix_ci, prefix_cs in table["prefixes"].items():
+        for unit_ci, unit_cs in table["metric"].items():
+            lookup[(prefix_ci + unit_ci).upper()] = prefix_cs + unit_cs
+    # Plain atoms take precedence over prefixed ones, as in get_atom_table.
+    for units in (table["metric"], table["non_metric"]):
+        lookup.update((unit_ci.upper(), unit_cs) for unit_ci, unit_cs in units.items())
+    return lookup, UcumTokenizer(lookup)
+
+
+def ucum_case_insensitive_to_cs(ucum_code: str) -> str:
+    """
+    Convert a case-insensitive UCUM code to the case-sensitive form.
+
+    E.g. "MG/DL" or "mg/dl" -> "mg/dL" and "UMOL/L" -> "umol/L". Simple units
+    are found with a longest-match trie and translated by a dictionary lookup
+    in the precomputed table of update_ci_to_cs_table_file, annotations are
+    kept as they are. The syntax is not checked, the result is validated when
+    it is parsed by the case-sensitive parser (e.g. by from_ucum).
+    """
+    lookup, tokenizer = _get_ci_to_cs_lookup()
+    text = ucum_code.upper()
+    parts = []
+    pos = 0
+    while pos < len(text):
+        if text[pos] == "{":
+            end = text.find("}", pos) + 1 or len(text)
+            parts.append(ucum_code[pos:end])  # annotations are case-sensitive
+        elif atom := tokenizer.match_atom(text, pos):
+            parts.append(lookup[atom])
+            end = pos + len(atom)
+            while end < len(text) and (text[end] in DIGITS or text[end] in "+-"):
+                end += 1  # exponent
+            parts.append(text[pos + len(atom) : end])
+        else:  # factors, operators and parentheses
+            end = pos + 1
+            parts.append(text[pos])
+        pos = end
+    return "".join(parts)
+
+
+def get_terminal_literals(ucum_grammar: str) -> dict[str, list[str]]:
+    """
+    Extract the string literals of the prefix and unit terminals from a grammar.
 
-def get_ucum_parser(grammar_file=None):
+    Works for grammars created by update_lark_ucum_grammar_file.
+    """
+    literals = {}
+    for name in ATOM_TERMINALS:
+        match = re.search(
+            rf"^\s*{name}:(.*?)(?=^\s*[A-Z_]+\s*:|\Z)",
+            ucum_grammar,
+            re.MULTILINE | re.DOTALL,
+        )
+        if match is None:
+            msg = f"Terminal {name} not found in UCUM grammar."
+            raise ValueError(msg)
+        literals[name] = re.findall(r'"([^"]*)"', match.group(1))
+    return literals
+
+
+def get_atom_table(ucum_grammar: str) -> dict[str, tuple[tuple[str, str], ...]]:
+    """
+    Map each valid simple unit string to its (terminal name, value) tokens.
+
+    The table covers all unit atoms and all combinations of a prefix with a
+    metric unit atom, e.g. "dar" -> (("PREFIX_SHORT", "d"), ("UNIT_METRIC", "ar")).
+    """
+    literals = get_terminal_literals(ucum_grammar)
+    table = {}
+    for prefix_type in ("PREFIX_SHORT", "PREFIX_LONG"):
+        for prefix in literals[prefix_type]:
+            for unit in literals["UNIT_METRIC"]:
+                table[prefix + unit] = ((prefix_type, prefix), ("UNIT_METRIC", unit))
+    for unit_type in ("UNIT_METRIC", "UNIT_NON_METRIC"):
+        for unit in literals[unit_type]:
+            table[unit] = ((unit_type, unit),)
+    return table
+
+
+class UcumAtomSplitter:
+    """
+    Lark post-lexer that splits ATOM tokens into prefix and unit tokens.
+    """
+
+    always_accept = ("ATOM",)
+
+    def __init__(self, atom_table):
+        self.atom_table = atom_table
+
+    def process(self, stream):
+        for token in stream:
+            if token.type != "ATOM":
+                yield token
+                continue
+            pos = token.start_pos
+            column = token.column
+            for type_, value in self.atom_table[token.value]:
+                yield Token(type_, value, pos, token.line, column)
+                pos += len(value)
+                column += len(value)
+
+
+def build_lalr_grammar(ucum_grammar: str) -> tuple[str, dict]:
+    """Create the LALR grammar and atom table for the given Earley grammar."""
+    atom_table = get_atom_table(ucum_grammar)
+    # Longest atoms first to keep regex backtracking short.
+    atom_alternatives = "|".join(
+        re.escape(atom).replace("/", "\\/")
+        for atom in sorted(atom_table, key=len, reverse=True)
+    )
+    lalr_grammar = textwrap.dedent(
+        UCUM_GRAMMAR_LALR.format(atom_alternatives=atom_alternatives)
+    )
+    return lalr_grammar, atom_table
+
+
+def get_parser_cache_file(ucum_grammar: str, lexer: str = "trie") -> Path:
+    """
+    Default file for the serialized LALR parser of the given grammar.
+
+    The directory is taken from the environment variable UCUMVERT_CACHE_DIR and
+    defaults to "ucumvert" in the user cache directory. The file name contains
+    a hash of the grammar, the lexer and the lark version.
+    """
+    cache_dir = os.environ.get("UCUMVERT_CACHE_DIR")
+    if not cache_dir:
+        xdg_cache = os.environ.get("XDG_CACHE_HOME")
+        cache_dir = Path(xdg_cache) if xdg_cache else Path.home() / ".cache"
+        cache_dir = cache_dir / "ucumvert"
+    digest = hashlib.sha256(ucum_grammar.encode("utf8")).hexdigest()[:16]
+    filename = f"ucum_parser_{digest}_{lexer}_lark-{lark.__version__}.cache"
+    return Path(cache_dir) / filename
+
+
+class UcumParser:
+    """
+    UCUM parser with a fast LALR path and a fallback to the Earley parser.
+
+    Both parsers produce identical trees. The Earley parser is only built when
+    an input is rejected by the LALR parser, so that invalid input is reported
+    with the errors of the reference parser.
+
+    With cache=True the LALR parser is serialized to the file given by
+    get_parser_cache_file() and loaded from there by later instances. A path
+    may be given instead of True. Lark rebuilds the parser if the cached data
+    does not match the grammar, lark version or Python version.
+
+    The lexer is either "trie" (default) for the hand-written UcumLexer or
+    "regex" for lark's contextual lexer with a regex for the ATOM terminal.
+    """
+
+    def __init__(
+        self,
+        ucum_grammar: str,
+        *,
+        cache: bool | str | Path = False,
+        lexer: str = "trie",
+    ):
+        lark_lexers = {"trie": UcumLexer, "regex": "contextual"}
+        if lexer not in lark_lexers:
+            msg = f"Unknown lexer {lexer!r}, use 'trie' or 'regex'."
+            raise ValueError(msg)
+        self.ucum_grammar = ucum_grammar
+        lalr_grammar, atom_table = build_lalr_grammar(ucum_grammar)
+        lark_cache = False
+        if cache:
+            cache_file = (
+                get_parser_cache_file(ucum_grammar, lexer)
+                if cache is True
+                else Path(cache)
+            )
+            with contextlib.suppress(OSError):  # lark logs failures to write
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+            lark_cache = str(cache_file)
+        self.lalr = Lark(
+            lalr_grammar,
+            start="main_term",
+            parser="lalr",
+            lexer=lark_lexers[lexer],
+            postlex=UcumAtomSplitter(atom_table),
+            cache=lark_cache,
+        )
+        self._earley = None
+
+    @property
+    def earley(self) -> Lark:
+        if self._earley is None:
+            self._earley = Lark(self.ucum_grammar, start="main_term", strict=True)
+        return self._earley
+
+    def parse(self, ucum_code: str):
+        try:
+            return self.lalr.parse(ucum_code)
+        except UnexpectedInput:
+            logger.debug("LALR parser rejected %r, trying Earley.", ucum_code)
+        return self.earley.parse(ucum_code)
+
+
+def get_ucum_parser(
+    grammar_file=None, *, engine="lalr", cache=False, case_sensitive=True
+):
+    """
+    Create a parser for UCUM unit codes.
+
+    Parameters
+    ----------
+    grammar_file :
+        Lark grammar file, defaults to the shipped "ucum_grammar.lark" or, with
+        case_sensitive=False, "ucum_grammar_ci.lark".
+    engine :
+        "lalr" (default) for a UcumParser that uses the fast LALR parser with
+        fallback to Earley, "earley" for the plain lark Earley parser, or
+        "descent" for a UcumDescentParser that transforms UCUM codes without
+        building parse trees.
+    cache :
+        For engines "lalr" and "descent": load the LALR parser from a
+        serialized cache file and create the file if needed, see UcumParser.
+        True for the default file or a path to the cache file.
+    case_sensitive :
+        Select the default grammar for case-sensitive (default) or
+        case-insensitive UCUM codes. The case-insensitive grammar accepts the
+        upper-case codes of UCUM, e.g. "MG/DL", see also
+        ucum_case_insensitive_to_cs.
+    """
     if grammar_file is None:
-        grammar_file = Path(__file__).resolve().parent / "ucum_grammar.lark"
-    with grammar_file.open("r", encoding="utf8") as f:
+        grammar_file = GRAMMAR_FILE if case_sensitive else GRAMMAR_FILE_CI
+    with Path(grammar_file).open("r", encoding="utf8") as f:
         ucum_grammar = f.read()
-    return Lark(ucum_grammar, start="main_term", strict=True)
+    if engine == "earley":
+        return Lark(ucum_grammar, start="main_term", strict=True)
+    if engine == "lalr":
+        return UcumParser(ucum_grammar, cache=cache)
+    if engine == "descent":
+        # Imported here, because the descent module builds on this module.
+        from ucumvert.descent import UcumDescentParser  # noqa: PLC0415
+
+        return UcumDescentParser(ucum_grammar, cache=cache)
+    msg = f"Unknown parser engine {engine!r}, use 'lalr', 'earley' or 'descent'."
+    raise ValueError(msg)
+
+
+def get_shared_ucum_parser(engine="lalr", *, case_sensitive=True, cache=None):
+    """
+    Return the parser for the shipped grammar, created once per process.
+
+    The parsers keep no state between parse calls, so they can be shared,
+    e.g. by all PintUcumRegistry instances. The case-sensitive and the
+    case-insensitive parsers are cached independently of each other.
+
+    cache is passed to get_ucum_parser. None (default) takes it from the
+    environment variable UCUMVERT_PARSER_CACHE, see get_parser_cache_default.
+    """
+    if cache is None:
+        cache = get_parser_cache_default()
+    return _get_shared_ucum_parser(engine, case_sensitive, cache)
+
+
+@functools.cache
+def _get_shared_ucum_parser(engine, case_sensitive, cache):
+    return get_ucum_parser(engine=engine, case_sensitive=case_sensitive, cache=cache)
+
+
+def get_parser_cache_default() -> bool:
+    """
+    Return whether shared parsers use the serialized LALR parser by default.
+
+    True if the environment variable UCUMVERT_PARSER_CACHE is set to "1",
+    "true" or "yes" (any case), e.g. to start worker processes, the CLI and
+    registries without building the LALR tables.
+    """
+    value = os.environ.get("UCUMVERT_PARSER_CACHE", "")
+    return value.strip().lower() in ("1", "true", "yes")
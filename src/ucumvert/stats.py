@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import bisect
+import contextlib
+import heapq
+import logging
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets in seconds (1-2-5 steps from 1 us to
+# 1 s), the last bucket counts all longer timings.
+BUCKET_BOUNDS = (*(m * 10.0**e for e in range(-6, 0) for m in (1, 2, 5)), 1.0)
+
+
+class TimingHistogram:
+    """Count, total, maximum and bucketed distribution of timings in seconds."""
+
+    __slots__ = ("buckets", "count", "max", "total")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def snapshot(self) -> dict:
+        """Return the statistics, histogram keyed by bucket upper bound ("le")."""
+        labels = [f"{bound:g}" for bound in BUCKET_BOUNDS] + ["inf"]
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "histogram": {label: n for label, n in zip(labels, self.buckets) if n},
+        }
+
+
+class UcumStats:
+    """
+    Opt-in counters and per-stage timings of UCUM conversions.
+
+    Pass an instance (or True) as ucum_stats to PintUcumRegistry, or as stats
+    to UcumPreprocessor; several of them may share one instance. Without
+    stats the conversions only check for None, so the overhead is negligible.
+
+    The counters are "calls", "hits" and "misses" of the cache, "errors" of
+    failed conversions, "error_cache_hits" of invalid codes that are rejected
+    from the error cache, and for from_ucum_many "batch_calls", "batch_codes"
+    and "parallel_codes" (codes converted by worker processes), and for
+    convert_ucum_column "column_calls" and "column_codes". The stages
+    timed for each conversion are "parse" (lark parser), "transform"
+    (transformer walk, including "pint") and "pint" (pint's parsing of unit
+    names in simple_unit). With the descent engine, parsing is part of
+    "transform". "total" is the time of each conversion (cache misses), for
+    which the slowest UCUM codes are kept, "batch" of from_ucum_many and
+    "column" of convert_ucum_column.
+
+    Parameters
+    ----------
+    slowest :
+        Number of slowest UCUM codes to keep, see log_slowest. Default is 10.
+    """
+
+    def __init__(self, slowest: int = 10):
+        self.slowest = slowest
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Set all counters and timings to zero."""
+        with self._lock:
+            self.counters = Counter()
+            self.stages = {}
+            self._slowest = []  # min-heap of (seconds, ucum_code)
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = TimingHistogram()
+            histogram.add(seconds)
+
+    def add_code_time(self, ucum_code: str, seconds: float) -> None:
+        """Record the "total" time of a conversion and keep the slowest codes."""
+        self.add_time("total", seconds)
+        if self.slowest <= 0:
+            return
+        with self._lock:
+            if len(self._slowest) < self.slowest:
+                heapq.heappush(self._slowest, (seconds, ucum_code))
+            elif seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, (seconds, ucum_code))
+
+    def timer(self, stage: str) -> _StageTimer:
+        """Context manager that adds the time of its block to stage."""
+        return _StageTimer(self, stage)
+
+    def slowest_codes(self) -> list[tuple[str, float]]:
+        """Return the slowest (ucum_code, seconds), slowest first."""
+        with self._lock:
+            ranked = sorted(self._slowest, reverse=True)
+        return [(ucum_code, seconds) for seconds, ucum_code in ranked]
+
+    def snapshot(self) -> dict:
+        """Return a dict of plain values with counters, stages and slowest codes."""
+        with self._lock:
+            counters = dict(self.counters)
+            stages = {name: h.snapshot() for name, h in self.stages.items()}
+        return {
+            "counters": counters,
+            "stages": stages,
+            "slowest": self.slowest_codes(),
+        }
+
+    def log_slowest(self, level: int = logging.INFO) -> None:
+        """Log the slowest UCUM codes seen."""
+        for ucum_code, seconds in self.slowest_codes():
+            logger.log(level, "%10.1f us  %s", seconds * 1e6, ucum_code)
+
+
+_NO_TIMER = contextlib.nullcontext()
+
+
+def stage_timer(stats: UcumStats | None, stage: str):
+    """Return stats.timer(stage), or a shared no-op context manager for None."""
+    return _NO_TIMER if stats is None else _StageTimer(stats, stage)
+
+
+class _StageTimer:
+    __slots__ = ("stage", "start", "stats")
+
+    def __init__(self, stats, stage):
+        self.stats = stats
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stats.add_time(self.stage, time.perf_counter() - self.start)
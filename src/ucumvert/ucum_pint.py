@@ -1,30 +1,58 @@
 from __future__ import annotations
 
 import contextlib
+import copy
+import hashlib
+import json
 import logging
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import NamedTuple
+from xml.etree import ElementTree
 
+import pint
 from lark import Transformer
-from lark.exceptions import VisitError
+from lark.exceptions import LarkError, UnexpectedCharacters, VisitError
 from pint import (
     DefinitionSyntaxError,
+    PintError,
     UndefinedUnitError,
     UnitRegistry,
     get_application_registry,
 )
+from pint.util import UnitsContainer
 
+from ucumvert.cache import LRUCache
+from ucumvert.stats import UcumStats, stage_timer
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
 from ucumvert.parser import (
+    get_parser_cache_default,
+    get_shared_ucum_parser,
     get_ucum_parser,
 )
 from ucumvert.xml_util import (
+    get_base_units,
     get_metric_units,
     get_non_metric_units,
     get_prefixes,
+    get_root,
     get_units_with_full_definition,
 )
 
 logger = logging.getLogger(__name__)
 
+# UCUM codes consist of printable ASCII characters (33-126) only.
+NON_UCUM_CHARS = re.compile(r"[^!-~]")
+
 
 # Some UCUM unit atoms are syntactically incompatible with pint. For these we
 # map to a pint-compatible unit name which we define in pint_ucum_defs.txt
@@ -106,6 +134,12 @@ MAPPINGS_UCUM_TO_PINT = {
     "[h]": "planck_constant",
 }
 
+# UCUM atoms preferred by PintUcumRegistry.to_ucum where several atoms map to
+# the same pint unit, e.g. "L" and "l" to liter. Otherwise atoms without a
+# mapping above are preferred, then unprefixed atoms, then the order in
+# ucum-essence.xml.
+PREFERRED_UCUM_ATOMS = frozenset({"L", "[IU]", "a", "mo", "cal", "By"})
+
 
 class UcumToPintTransformer(Transformer):
     def __init__(self, ureg=None):
@@ -118,6 +152,9 @@ class UcumToPintTransformer(Transformer):
                 )
         else:
             self.ureg = ureg
+        # Resolved quantities of simple units, keyed by (prefix, atom) or (atom,)
+        self.unit_table = {}
+        self.stats = None  # UcumStats for timing the "pint" stage
 
     def main_term(self, args):
         # print("DBGmt>", repr(args), len(args))
@@ -153,6 +190,32 @@ class UcumToPintTransformer(Transformer):
 
     def simple_unit(self, args):
         # print("DBGsu>", repr(args), len(args))
+        if len(args) == 1 and args[0].isdigit():  # FACTOR
+            with stage_timer(self.stats, "pint"):
+                return self.ureg(args[0])
+        key = tuple(args)
+        quantity = self.unit_table.get(key)
+        if quantity is None:
+            with stage_timer(self.stats, "pint"):
+                quantity = self.unit_table[key] = self._resolve_simple_unit(args)
+        # Return a copy, since in-place operations like ito() modify a quantity.
+        return copy.copy(quantity)
+
+    def build_unit_table(self) -> None:
+        """Resolve all UCUM unit atoms and prefixed metric atoms at once.
+
+        Otherwise simple units are resolved on first use. Atoms that pint
+        cannot resolve (e.g. prefixed offset units) are left out.
+        """
+        metric_units = get_base_units() + get_metric_units()
+        keys = [(atom,) for atom in metric_units + get_non_metric_units()]
+        keys += [(prefix, atom) for prefix in get_prefixes() for atom in metric_units]
+        for key in keys:
+            if key not in self.unit_table:
+                with contextlib.suppress(PintError):
+                    self.unit_table[key] = self._resolve_simple_unit(list(key))
+
+    def _resolve_simple_unit(self, args):
         if len(args) == 2:  # prefix is present  # noqa: PLR2004
             # Work around a pint bug: parsing of abbreviated custom unit with prefix
             #   that could be a unit (k,m,M) does not detect the prefix but 2 units.
@@ -224,21 +287,76 @@ class UcumToPintStrTransformer(Transformer):
         return f"({args[0]})"
 
 
-def ucum_preprocessor(unit_input):
+class UcumPreprocessor:
     """
     Preprocessor for pint to convert all input from UCUM to pint units.
 
+    The UCUM parser is created on first use (or passed in, e.g. the one of a
+    PintUcumRegistry) and shared by all calls. The rewritten strings are cached
+    in an LRU cache of cache_size entries. Pass a UcumStats as stats to count
+    the calls and time the rewrites.
+
     Note: This will make most standard pint unit expressions invalid.
 
     Usage:
-        >>> from ucumvert import PintUcumRegistry, ucum_preprocessor
+        >>> from ucumvert import PintUcumRegistry, UcumPreprocessor
         >>> ureg = PintUcumRegistry()
-        >>> ureg.preprocessors.append(ucum_preprocessor)
+        >>> ureg.preprocessors.append(UcumPreprocessor(ureg._ucum_parser))
     """
-    ucum_parser = get_ucum_parser()
-    transformer = UcumToPintStrTransformer()
-    parsed_data = ucum_parser.parse(unit_input)
-    return str(transformer.transform(parsed_data))
+
+    def __init__(
+        self,
+        ucum_parser=None,
+        cache_size: int | None = 1024,
+        stats: UcumStats | None = None,
+    ):
+        self._ucum_parser = ucum_parser
+        self._transformer = UcumToPintStrTransformer()
+        self._cache = LRUCache(cache_size)
+        self.stats = stats
+
+    @property
+    def ucum_parser(self):
+        if self._ucum_parser is None:
+            self._ucum_parser = get_ucum_parser()
+        return self._ucum_parser
+
+    def __call__(self, unit_input):
+        stats = self.stats
+        if stats is not None:
+            stats.count("calls")
+        pint_str = self._cache.get(unit_input)
+        if pint_str is None:
+            start = time.perf_counter()
+            try:
+                with stage_timer(stats, "parse"):
+                    parsed_data = self.ucum_parser.parse(unit_input)
+                with stage_timer(stats, "transform"):
+                    pint_str = str(self._transformer.transform(parsed_data))
+            except LarkError:
+                if stats is not None:
+                    stats.count("errors")
+                raise
+            finally:
+                if stats is not None:
+                    stats.count("misses")
+                    stats.add_code_time(unit_input, time.perf_counter() - start)
+            self._cache[unit_input] = pint_str
+        elif stats is not None:
+            stats.count("hits")
+        return pint_str
+
+    def cache_info(self):
+        """Return (hits, misses, maxsize, currsize) of the rewrite cache."""
+        return self._cache.info()
+
+    def cache_clear(self) -> None:
+        self._cache.clear()
+
+
+# Shared instance for use as pint preprocessor, see UcumPreprocessor.
+#   >>> ureg.preprocessors.append(ucum_preprocessor)
+ucum_preprocessor = UcumPreprocessor()
 
 
 def find_ucum_codes_that_need_mapping(existing_mappings=MAPPINGS_UCUM_TO_PINT):
@@ -288,67 +406,291 @@ def is_in_registry(transformer, ucum_code):
     return True
 
 
-def find_matching_pint_definitions(report_file: Path | None = None) -> None:
-    """Find Pint units that match UCUM units."""
+MAPPING_REPORT_SECTIONS = {
+    "prefixes": get_prefixes,
+    "metric": get_metric_units,
+    "non-metric": get_non_metric_units,
+}
+
+
+class _MappingReportContext:
+    """Registries and parser for computing the lines of the mapping report."""
+
+    def __init__(self, parser_cache=None):
+        self.ureg_default = UnitRegistry()
+        self.ureg_ucum = UnitRegistry()
+        self.ureg_ucum.load_definitions(
+            Path(__file__).resolve().parent / "pint_ucum_defs.txt"
+        )
+        self.ucum_parser = get_shared_ucum_parser(cache=parser_cache)
+        self.transformer_default = UcumToPintTransformer(ureg=self.ureg_default)
+        self.transformer_ucum = UcumToPintTransformer(ureg=self.ureg_ucum)
+        self.details_by_unit = {
+            u.code_cs: u for u in get_units_with_full_definition("Code")
+        }
+
+    def line(self, section, ucum_code):
+        """Return the report line for a UCUM prefix or unit atom."""
+        lookup_str = f"{ucum_code}m" if section == "prefixes" else ucum_code
+        try:
+            parsed_data = self.ucum_parser.parse(lookup_str)
+        except VisitError as exc:
+            logger.exception("PARSER ERROR: %s", {exc.args[0]})
+            raise
+        lookup_str = MAPPINGS_UCUM_TO_PINT.get(ucum_code, ucum_code)
+        if is_in_registry(self.transformer_default, parsed_data):
+            if section == "prefixes":
+                pint_prefix = str(
+                    self.ureg_default(f"{ucum_code}m").units
+                ).removesuffix("meter")
+                return f"# {lookup_str:>10} --> {pint_prefix} (default registry)"
+            info = format_unit_as_pint_definition(self.details_by_unit[ucum_code])
+            pint_unit = f"{self.ureg_default(lookup_str).units} (default registry)"
+            return f"# {ucum_code:>10} --> {pint_unit:<42} # {info}"
+        info = format_unit_as_pint_definition(self.details_by_unit[ucum_code])
+        if is_in_registry(self.transformer_ucum, parsed_data):
+            pint_unit = f"{self.ureg_ucum(lookup_str).units} (ucumvert registry)"
+            return f"# {ucum_code:>10} --> {pint_unit:<42} # {info}"
+        return f"# {ucum_code:>10} --> {'NOT DEFINED':<42} # {info}"
+
+
+def _mapping_report_entry_keys(entries) -> list[str]:
+    """
+    Hash the inputs of each report entry for incremental report generation.
+
+    An entry depends on its definition in ucum-essence.xml and its mapping in
+    MAPPINGS_UCUM_TO_PINT, and like all entries on pint_ucum_defs.txt and the
+    pint version.
+    """
+    shared = hashlib.sha256(pint.__version__.encode("utf8") + b"\0")
+    shared.update((Path(__file__).resolve().parent / "pint_ucum_defs.txt").read_bytes())
+    elements = {}
+    for tag in ("prefix", "base-unit", "unit"):
+        for el in get_root().iterfind(f".//{{*}}{tag}[@Code]"):
+            elements[tag != "prefix", el.attrib["Code"]] = ElementTree.tostring(el)
+    keys = []
+    for section, ucum_code in entries:
+        key = shared.copy()
+        key.update(section.encode("utf8") + b"\0")
+        key.update(elements[section != "prefixes", ucum_code])
+        key.update(repr(MAPPINGS_UCUM_TO_PINT.get(ucum_code)).encode("utf8"))
+        keys.append(key.hexdigest())
+    return keys
+
+
+def find_matching_pint_definitions(
+    report_file: Path | None = None,
+    *,
+    max_workers: int | None = 1,
+    incremental: bool = False,
+) -> None:
+    """
+    Find Pint units that match UCUM units.
+
+    Parameters
+    ----------
+    report_file :
+        File to write the report to, by default the shipped
+        pint_ucum_defs_mapping_report.txt.
+    max_workers :
+        Number of worker processes. With 1 (default) all entries are computed
+        in this process, otherwise they are sharded across a
+        ProcessPoolExecutor (None means number of CPUs). Each worker builds
+        its registries once.
+    incremental :
+        Keep the computed lines in a JSON file next to the report (same name
+        with suffix ".json") and recompute only the entries whose inputs
+        changed since the last run, see _mapping_report_entry_keys.
+    """
     if report_file is None:
         report_file = (
             Path(__file__).resolve().parent / "pint_ucum_defs_mapping_report.txt"
         )
+    state_file = Path(report_file).with_suffix(".json")
+
+    entries = [
+        (section, ucum_code)
+        for section, get_fcn in MAPPING_REPORT_SECTIONS.items()
+        for ucum_code in get_fcn("Code")
+    ]
+    keys = _mapping_report_entry_keys(entries)
+    stored = {}
+    if incremental and state_file.exists():
+        with state_file.open(encoding="utf8") as fp:
+            stored = json.load(fp)
+    lines = dict(zip(keys, (stored.get(key) for key in keys)))
+    to_compute = [
+        (entry, key) for entry, key in zip(entries, keys) if lines[key] is None
+    ]
+    logger.info(
+        "Computing %d of %d mapping report entries.", len(to_compute), len(entries)
+    )
+    if max_workers == 1 and to_compute:
+        context = _MappingReportContext()
+        lines.update((key, context.line(*entry)) for entry, key in to_compute)
+    elif to_compute:
+        n_chunks = 4 * (max_workers or os.cpu_count() or 1)
+        chunks = [to_compute[i::n_chunks] for i in range(n_chunks)]
+        with ProcessPoolExecutor(
+            max_workers,
+            initializer=_init_mapping_report_worker,
+            initargs=(get_parser_cache_default(),),
+        ) as pool:
+            for chunk, results in zip(
+                chunks,
+                pool.map(_mapping_report_lines, [[e for e, _ in c] for c in chunks]),
+            ):
+                lines.update(zip((key for _, key in chunk), results))
 
     report = [
         "# Computed list of mappings between pint, ucumvert and UCUM units for easy review."
     ]
-
-    ureg_default = UnitRegistry()
-    ureg_ucum = UnitRegistry()
-    ureg_ucum.load_definitions(Path(__file__).resolve().parent / "pint_ucum_defs.txt")
-    ucum_parser = get_ucum_parser()
-    transformer_default = UcumToPintTransformer(ureg=ureg_default)
-    transformer_ucum = UcumToPintTransformer(ureg=ureg_ucum)
-
-    details_by_unit = {u.code_cs: u for u in get_units_with_full_definition()}
-    sections = {
-        "prefixes": get_prefixes,
-        "metric": get_metric_units,
-        "non-metric": get_non_metric_units,
-    }
-    for section, get_fcn in sections.items():
-        report.append(f"\n# === {section} ===")
-        for ucum_code in get_fcn():
-            lookup_str = f"{ucum_code}m" if section == "prefixes" else ucum_code
-            try:
-                parsed_data = ucum_parser.parse(lookup_str)
-            except VisitError as exc:
-                logger.exception("PARSER ERROR: %s", {exc.args[0]})
-                raise
-            lookup_str = MAPPINGS_UCUM_TO_PINT.get(ucum_code, ucum_code)
-            if is_in_registry(transformer_default, parsed_data):
-                if section == "prefixes":
-                    pint_prefix = str(ureg_default(f"{ucum_code}m").units).removesuffix(
-                        "meter"
-                    )
-                    report.append(
-                        f"# {lookup_str:>10} --> {pint_prefix} (default registry)"
-                    )
-                else:
-                    info = format_unit_as_pint_definition(details_by_unit[ucum_code])
-                    pint_unit = f"{ureg_default(lookup_str).units} (default registry)"
-                    report.append(f"# {ucum_code:>10} --> {pint_unit:<42} # {info}")
-                continue
-            if is_in_registry(transformer_ucum, parsed_data):
-                info = format_unit_as_pint_definition(details_by_unit[ucum_code])
-                pint_unit = f"{ureg_ucum(lookup_str).units} (ucumvert registry)"
-                report.append(f"# {ucum_code:>10} --> {pint_unit:<42} # {info}")
-            else:
-                info = format_unit_as_pint_definition(details_by_unit[ucum_code])
-                report.append(f"# {ucum_code:>10} --> {'NOT DEFINED':<42} # {info}")
+    current_section = None
+    for (section, _), key in zip(entries, keys):
+        if section != current_section:
+            report.append(f"\n# === {section} ===")
+            current_section = section
+        report.append(lines[key])
 
     with Path(report_file).open("w", encoding="utf8") as fp:
         fp.write("\n".join(report) + "\n")
     logger.info("Created mapping report: %s", report_file)
+    if incremental:
+        with state_file.open("w", encoding="utf8") as fp:
+            json.dump(lines, fp, indent=0)
+            fp.write("\n")
+
+
+# Value at which the factor of affine conversions is taken, large enough for
+# the offset to be negligible in the difference to the value at 0.
+_AFFINE_SCALE = 1e12
+
+
+class UcumBatchResult(NamedTuple):
+    """
+    Results of a batch conversion, aligned with the input UCUM codes.
+
+    quantities holds the pint quantity or None for codes that failed,
+    errors holds None or the exception raised for the code.
+    """
+
+    quantities: list
+    errors: list
+
+    @property
+    def error_mask(self) -> list[bool]:
+        return [error is not None for error in self.errors]
+
+
+class UcumColumnResult(NamedTuple):
+    """
+    Values of a mixed-unit column converted to one target UCUM code.
+
+    values is a float array aligned with the input (NaN where masked), mask
+    is True for rows whose UCUM code is invalid or not commensurable with the
+    target, errors maps each of these codes to the exception raised for it.
+    """
+
+    values: np.ndarray
+    mask: np.ndarray
+    errors: dict
+
+
+class UcumConverter:
+    """
+    Vectorized conversion of values from a source to a target UCUM code.
+
+    Conversions between multiplicative and offset units (e.g. "Cel" to
+    "[degF]") are applied as factor * values + offset in one NumPy operation.
+    For logarithmic units (e.g. "B[V]", "Np") factor and offset are None and
+    the values are converted as a pint Quantity array by function.
+    """
+
+    __slots__ = ("factor", "function", "offset", "source", "target")
+
+    def __init__(self, source, target, factor=None, offset=0.0, function=None):
+        self.source = source
+        self.target = target
+        self.factor = factor
+        self.offset = offset
+        self.function = function
+
+    def __call__(self, values):
+        """Convert a scalar, sequence or NumPy array of values."""
+        if np is not None:
+            values = np.asarray(values)
+        if self.function is not None:
+            return self.function(values)
+        result = values * self.factor
+        if self.offset:
+            result += self.offset
+        return result
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}({self.source!r}, {self.target!r}, "
+            f"factor={self.factor!r}, offset={self.offset!r})"
+        )
 
 
 class PintUcumRegistry(UnitRegistry):
+    """
+    Pint UnitRegistry with UCUM unit definitions and a from_ucum method.
+
+    Parameters
+    ----------
+    ucum_cache_size :
+        Maximum number of UCUM codes whose from_ucum result is cached
+        (least recently used codes are evicted first), of (source,
+        target) pairs whose ucum_converter is cached and of pint units
+        formatted by to_ucum. None means unbounded, 0 disables the caches.
+        Default is 1024.
+    ucum_error_cache_size :
+        Maximum number of invalid UCUM codes whose error is cached, so that
+        from_ucum raises again without parsing. Same meaning of the values
+        as for ucum_cache_size. Default is 1024.
+    ucum_engine :
+        Parser engine for from_ucum, see get_ucum_parser: "lalr" (default),
+        "earley" or "descent" (no parse trees, fastest). The parser is
+        built once per engine and shared by all registries.
+    ucum_stats :
+        True or a UcumStats instance to record counters and per-stage timings
+        of from_ucum and from_ucum_many, see the ucum_stats attribute.
+        Default is False (no instrumentation).
+    ucum_parser_cache :
+        True (or a file path) to load the LALR parser from its serialized
+        cache file, which is created on first use, see get_ucum_parser. Also
+        used by the worker processes of from_ucum_many. None (default) takes
+        the setting from the environment variable UCUMVERT_PARSER_CACHE.
+
+    All other arguments are passed to pint's UnitRegistry. With pint's
+    cache_folder=":auto:" (or a directory) the parsed pint and UCUM
+    definitions are cached on disk, which makes constructing further
+    registries about ten times faster.
+    """
+
+    def __init__(
+        self,
+        *args,
+        ucum_cache_size: int | None = 1024,
+        ucum_error_cache_size: int | None = 1024,
+        ucum_engine: str = "lalr",
+        ucum_stats: bool | UcumStats = False,
+        ucum_parser_cache: bool | str | Path | None = None,
+        **kwargs,
+    ):
+        self._ucum_stats = UcumStats() if ucum_stats is True else ucum_stats or None
+        self._ucum_cache = LRUCache(ucum_cache_size)
+        self._ucum_errors = LRUCache(ucum_error_cache_size)
+        self._ucum_converters = LRUCache(ucum_cache_size)
+        self._ucum_formats = LRUCache(ucum_cache_size)
+        self._ucum_index = None  # pint unit name -> UCUM code, see to_ucum
+        self._ucum_transformer = None  # created in _after_init
+        self._ucum_lock = threading.RLock()
+        self._ucum_engine = ucum_engine
+        self._ucum_parser_cache = ucum_parser_cache
+        super().__init__(*args, **kwargs)
+
     def _after_init(self) -> None:
         """This is called after all __init__"""
         super()._after_init()  # load pint's default unit definitions
@@ -360,19 +702,532 @@ class PintUcumRegistry(UnitRegistry):
         self._build_cache(loaded_files)
 
         # Initialise UCUM parser and transformer
-        self._ucum_parser = get_ucum_parser()
-        self._from_ucum_transformer = UcumToPintTransformer().transform
+        self._ucum_parser = get_shared_ucum_parser(
+            self._ucum_engine, cache=self._ucum_parser_cache
+        )
+        self._ucum_transformer = UcumToPintTransformer(self)
+        self._ucum_transformer.stats = self._ucum_stats
+        self._from_ucum_transformer = self._ucum_transformer.transform
+
+    def define(self, definition) -> None:
+        """Add a definition to the registry, see pint's UnitRegistry.define.
+
+        The UCUM caches are cleared, since codes may now resolve differently.
+        """
+        super().define(definition)
+        self._ucum_definitions_changed()
+
+    def load_definitions(self, file, *args, **kwargs):
+        """Add definitions from a file, see pint's UnitRegistry.load_definitions.
+
+        The UCUM caches are cleared, since codes may now resolve differently.
+        """
+        parsed_project = super().load_definitions(file, *args, **kwargs)
+        self._ucum_definitions_changed()
+        return parsed_project
+
+    def _ucum_definitions_changed(self) -> None:
+        """Clear all UCUM results that depend on the pint definitions."""
+        with self._ucum_lock:
+            self.ucum_cache_clear()
+            self._ucum_index = None
+            if self._ucum_transformer is not None:
+                self._ucum_transformer.unit_table.clear()
+
+    @property
+    def ucum_stats(self) -> UcumStats | None:
+        """UcumStats of from_ucum or None; set to True or a UcumStats to enable."""
+        return self._ucum_stats
+
+    @ucum_stats.setter
+    def ucum_stats(self, stats: bool | UcumStats | None) -> None:
+        self._ucum_stats = UcumStats() if stats is True else stats or None
+        self._ucum_transformer.stats = self._ucum_stats
 
     def from_ucum(self, ucum_code):
         """Transform an ucum_code to a pint unit.
 
+        Thread-safe: cache hits are served concurrently, codes that are not
+        cached are converted by one thread at a time.
+
         Parameters
         ----------
         ucum_code :
             Ucum code as string.
         """
-        parsed_data = self._ucum_parser.parse(ucum_code)
-        return self._from_ucum_transformer(parsed_data)
+        quantity = self._from_ucum_cached(ucum_code)
+        if quantity is None:
+            quantity = self._from_ucum_uncached(ucum_code)
+        # Return a copy, since in-place operations like ito() modify a quantity.
+        return copy.copy(quantity)
+
+    def _from_ucum_cached(self, ucum_code):
+        """Return the cached result (not copied) or None, raise cached errors."""
+        stats = self._ucum_stats
+        if stats is not None:
+            stats.count("calls")
+        quantity = self._ucum_cache.get(ucum_code)
+        if quantity is not None:
+            if stats is not None:
+                stats.count("hits")
+            return quantity
+        error = self._ucum_errors.get(ucum_code)
+        if error is not None:
+            if stats is not None:
+                stats.count("error_cache_hits")
+            # A fresh copy per caller, the cached exception is shared by threads.
+            raise _copy_exception(error)
+        return None
+
+    def _from_ucum_uncached(self, ucum_code):
+        """Convert ucum_code and store the result in the cache (not copied)."""
+        stats = self._ucum_stats
+        # pint's registry caches are not designed for concurrent updates.
+        with self._ucum_lock:
+            # Another thread may have converted the code while we waited.
+            quantity = self._ucum_cache.peek(ucum_code)
+            error = self._ucum_errors.peek(ucum_code)
+            if quantity is None and error is not None:
+                raise _copy_exception(error)
+            if quantity is None:
+                start = time.perf_counter()
+                try:
+                    quantity = self._convert_ucum(ucum_code)
+                except LarkError as exc:
+                    self._ucum_errors[ucum_code] = _copy_exception(exc)
+                    if stats is not None:
+                        stats.count("errors")
+                    raise
+                finally:
+                    if stats is not None:
+                        stats.count("misses")
+                        stats.add_code_time(ucum_code, time.perf_counter() - start)
+                self._ucum_cache[ucum_code] = quantity
+        return quantity
+
+    def _convert_ucum(self, ucum_code):
+        # Cheap rejection of free text, before the parser builds its error.
+        match = NON_UCUM_CHARS.search(ucum_code)
+        if match is not None:
+            pos = match.start()
+            raise UnexpectedCharacters(ucum_code, pos, 1, pos + 1)
+        stats = self._ucum_stats
+        if self._ucum_engine == "descent":
+            with stage_timer(stats, "transform"):
+                return self._ucum_parser.transform(ucum_code, self._ucum_transformer)
+        with stage_timer(stats, "parse"):
+            parsed_data = self._ucum_parser.parse(ucum_code)
+        with stage_timer(stats, "transform"):
+            return self._from_ucum_transformer(parsed_data)
+
+    def from_ucum_many(self, ucum_codes, *, max_workers=1) -> UcumBatchResult:
+        """Transform many UCUM codes to pint units without raising on bad codes.
+
+        Each distinct code is converted only once. Equal codes therefore share
+        the same quantity object, which must not be modified in place.
+
+        Parameters
+        ----------
+        ucum_codes :
+            Iterable of UCUM codes, e.g. a list, NumPy array or pandas Series.
+            Entries that are not strings (e.g. None or NaN) are reported as
+            TypeError.
+        max_workers :
+            Number of worker processes. With 1 (default) all codes are
+            converted in this process. Otherwise the distinct codes that are
+            not cached are sharded across a ProcessPoolExecutor (None means
+            number of CPUs). Each worker builds its own PintUcumRegistry once
+            (with the cache_folder and ucum_engine of this registry). The
+            results are rebuilt as quantities of this registry, and errors are
+            reported as LarkError with the worker's message. These errors are
+            not cached, so from_ucum still raises the parser's exception.
+        """
+        stats = self._ucum_stats
+        start = time.perf_counter()
+        ucum_codes = list(ucum_codes)
+        converted = {}
+        to_convert = []
+        for ucum_code in dict.fromkeys(ucum_codes):
+            error = ucum_code_type_error(ucum_code)
+            if error is not None:
+                converted[ucum_code] = (None, error)
+            elif (
+                max_workers == 1
+                or ucum_code in self._ucum_cache
+                or ucum_code in self._ucum_errors
+            ):
+                try:
+                    converted[ucum_code] = (self.from_ucum(ucum_code), None)
+                except LarkError as exc:  # parser errors and wrapped pint errors
+                    converted[ucum_code] = (None, exc)
+            else:
+                to_convert.append(ucum_code)
+        if to_convert:
+            converted.update(self._from_ucum_parallel(to_convert, max_workers))
+        results = [converted[ucum_code] for ucum_code in ucum_codes]
+        if stats is not None:
+            stats.count("batch_calls")
+            stats.count("batch_codes", len(ucum_codes))
+            stats.count("parallel_codes", len(to_convert))
+            stats.add_time("batch", time.perf_counter() - start)
+        return UcumBatchResult(
+            quantities=[quantity for quantity, _ in results],
+            errors=[error for _, error in results],
+        )
+
+    def _from_ucum_parallel(self, ucum_codes, max_workers):
+        n_chunks = 4 * (max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(
+            max_workers,
+            initializer=_init_ucum_worker,
+            initargs=(
+                self.cache_folder,
+                self._ucum_engine,
+                get_parser_cache_default()
+                if self._ucum_parser_cache is None
+                else self._ucum_parser_cache,
+            ),
+        ) as pool:
+            chunks = [ucum_codes[i::n_chunks] for i in range(n_chunks)]
+            for chunk, results in zip(chunks, pool.map(_from_ucum_compact, chunks)):
+                for ucum_code, (compact, error_msg) in zip(chunk, results):
+                    if error_msg is not None:
+                        # lark exceptions cannot be pickled, so only the message
+                        # is sent back. It is not cached, to keep the exception
+                        # types of from_ucum independent of the batches.
+                        yield ucum_code, (None, LarkError(error_msg))
+                        continue
+                    magnitude, unit_items = compact
+                    if unit_items is None:  # annotation-only code, see below
+                        quantity = magnitude
+                    else:
+                        quantity = self.Quantity(magnitude, UnitsContainer(unit_items))
+                    self._ucum_cache[ucum_code] = quantity
+                    # A copy like from_ucum, so ito() cannot modify the cache.
+                    yield ucum_code, (copy.copy(quantity), None)
+
+    def ucum_converter(self, source, target) -> UcumConverter:
+        """Return a cached converter of values from one UCUM code to another.
+
+        The conversion is resolved with pint once per (source, target) pair.
+        Incompatible codes raise pint's DimensionalityError.
+
+        Parameters
+        ----------
+        source :
+            UCUM code of the values to convert.
+        target :
+            UCUM code to convert the values to.
+        """
+        converter = self._ucum_converters.get((source, target))
+        if converter is None:
+            with self._ucum_lock:
+                converter = self._make_ucum_converter(source, target)
+            self._ucum_converters[source, target] = converter
+        return converter
+
+    def convert_ucum(self, values, source, target):
+        """Convert values (e.g. a NumPy array) from one UCUM code to another."""
+        return self.ucum_converter(source, target)(values)
+
+    def convert_ucum_column(self, values, ucum_codes, target) -> UcumColumnResult:
+        """Convert values with a UCUM code per row to one target UCUM code.
+
+        The codes are factorized and one ucum_converter is resolved per
+        distinct code, so a column with millions of rows but a few units is
+        converted with a few NumPy operations. Requires NumPy.
+
+        Parameters
+        ----------
+        values :
+            Sequence or NumPy array of numbers.
+        ucum_codes :
+            UCUM codes of the values, same length as values, e.g. a list,
+            NumPy array or pandas Series. Entries that are not strings (e.g.
+            None or NaN) are masked with a TypeError.
+        target :
+            UCUM code to convert all values to. An invalid target raises.
+        """
+        if np is None:  # pragma: no cover
+            msg = "convert_ucum_column requires NumPy."
+            raise ImportError(msg)
+        stats = self._ucum_stats
+        start = time.perf_counter()
+        self.from_ucum(target)
+        values = np.asarray(values, dtype=float)
+        ucum_codes = list(ucum_codes)
+        if len(ucum_codes) != len(values):
+            msg = (
+                f"Got {len(values)} values but {len(ucum_codes)} UCUM codes, "
+                "expected the same number."
+            )
+            raise ValueError(msg)
+        groups = {}  # ucum_code -> group index
+        inverse = np.fromiter(
+            (groups.setdefault(c, len(groups)) for c in ucum_codes),
+            dtype=np.intp,
+            count=len(ucum_codes),
+        )
+        factors = np.full(len(groups), np.nan)
+        offsets = np.zeros(len(groups))
+        invalid = np.zeros(len(groups), dtype=bool)
+        errors = {}
+        functions = []
+        for group, ucum_code in enumerate(groups):
+            error = ucum_code_type_error(ucum_code)
+            if error is None:
+                try:
+                    converter = self.ucum_converter(ucum_code, target)
+                except (LarkError, PintError) as exc:
+                    error = exc
+            if error is not None:
+                invalid[group] = True
+                errors[ucum_code] = error
+                continue
+            if converter.function is None:
+                factors[group] = converter.factor
+                offsets[group] = converter.offset
+            else:  # logarithmic units, converted group-wise by pint
+                functions.append((group, converter))
+        result = values * factors[inverse] + offsets[inverse]
+        for group, converter in functions:
+            rows = inverse == group
+            result[rows] = converter(values[rows])
+        if stats is not None:
+            stats.count("column_calls")
+            stats.count("column_codes", len(ucum_codes))
+            stats.add_time("column", time.perf_counter() - start)
+        return UcumColumnResult(result, invalid[inverse], errors)
+
+    def _make_ucum_converter(self, source, target):
+        src, tgt = self._ucum_quantity(source), self._ucum_quantity(target)
+
+        def function(values):
+            with self._ucum_lock:
+                quantity = self.Quantity(values * src.magnitude, src.units)
+                return quantity.to(tgt.units).magnitude / tgt.magnitude
+
+        unit_items = (*src.unit_items(), *tgt.unit_items())
+        kinds = {self._ucum_unit_kind(name) for name, _ in unit_items}
+        if "logarithmic" in kinds:
+            function(1)  # raises for incompatible units
+            return UcumConverter(source, target, None, None, function)
+        if "offset" in kinds:  # affine, e.g. "Cel" to "[degF]"
+            offset = function(0)
+            # function(1) - offset would cancel digits of the (large) offset.
+            factor = (function(_AFFINE_SCALE) - offset) / _AFFINE_SCALE
+            return UcumConverter(source, target, factor, offset)
+        return UcumConverter(source, target, function(1))
+
+    def _ucum_quantity(self, ucum_code):
+        quantity = self.from_ucum(ucum_code)
+        if isinstance(quantity, self.Quantity):
+            return quantity
+        # Annotations without a unit (lark Token, or numbers for terms of them)
+        if isinstance(quantity, str):
+            return self.Quantity(1)
+        return self.Quantity(quantity)
+
+    def _ucum_unit_kind(self, unit_name):
+        if self._is_multiplicative(unit_name):
+            return "multiplicative"
+        _, base_name, _ = self.parse_unit_name(unit_name)[0]
+        if self._units[base_name].is_logarithmic:
+            return "logarithmic"
+        return "offset"
+
+    def ucum_cache_info(self):
+        """Return (hits, misses, maxsize, currsize) of the from_ucum cache."""
+        return self._ucum_cache.info()
+
+    def to_ucum(self, unit) -> str:
+        """Format a pint unit as UCUM code, e.g. "milligram / deciliter" -> "mg/dL".
+
+        The unit names are looked up in a reverse index of all UCUM atoms and
+        prefixed metric atoms, which is built on first use (about half a
+        second). Formatted units are cached. Units without UCUM equivalent
+        and non-integer exponents raise ValueError.
+
+        Parameters
+        ----------
+        unit :
+            pint Unit, a string parsed by pint, or a Quantity whose magnitude
+            is an integer or the reciprocal of an integer (formatted as UCUM
+            factor, e.g. "100.mL" or "g/(24.h)").
+        """
+        factor, divisor = 1, 1
+        if isinstance(unit, str):
+            unit = self.Unit(unit)
+        elif isinstance(unit, self.Quantity):
+            factor, divisor = _ucum_factor(unit.magnitude)
+            unit = unit.units
+        parts = self._ucum_formats.get(unit._units)  # noqa: SLF001
+        if parts is None:
+            parts = self._format_ucum(unit._units)  # noqa: SLF001
+            self._ucum_formats[unit._units] = parts  # noqa: SLF001
+        numerator, denominator = parts
+        if factor != 1:
+            numerator = (str(factor), *numerator)
+        if divisor != 1:
+            denominator = (str(divisor), *denominator)
+        ucum_code = ".".join(numerator)
+        if len(denominator) == 1:
+            ucum_code += "/" + denominator[0]
+        elif denominator:
+            ucum_code += "/(" + ".".join(denominator) + ")"
+        return ucum_code or "1"
+
+    def _format_ucum(self, units) -> tuple[tuple, tuple]:
+        """Return the UCUM codes with exponents of the numerator and denominator."""
+        index = self._get_ucum_index()
+        numerator, denominator = [], []
+        for name, exponent in units.items():
+            if name not in index:
+                msg = f"No UCUM code known for pint unit {name!r}."
+                raise ValueError(msg)
+            if exponent != int(exponent):
+                msg = f"UCUM exponents are integers, got {exponent!r} for {name!r}."
+                raise ValueError(msg)
+            power = abs(int(exponent))
+            parts = numerator if exponent > 0 else denominator
+            parts.append(index[name] + (str(power) if power != 1 else ""))
+        return tuple(numerator), tuple(denominator)
+
+    def _get_ucum_index(self) -> dict:
+        """Return the reverse index {pint unit name: UCUM code}, see to_ucum."""
+        if self._ucum_index is None:
+            with self._ucum_lock:
+                self._ucum_index = self._ucum_index or self._build_ucum_index()
+        return self._ucum_index
+
+    def _build_ucum_index(self) -> dict:
+        transformer = self._ucum_transformer
+        transformer.build_unit_table()
+        ranked = []
+        for order, (key, quantity) in enumerate(transformer.unit_table.items()):
+            unit_items = quantity.unit_items()
+            if quantity.magnitude != 1 or len(unit_items) != 1:
+                continue
+            ((name, exponent),) = unit_items
+            if exponent != 1:
+                continue
+            atom = key[-1]
+            rank = (
+                atom in MAPPINGS_UCUM_TO_PINT,
+                atom not in PREFERRED_UCUM_ATOMS,
+                len(key),  # prefixed atoms have two parts
+                order,
+            )
+            ranked.append((rank, name, "".join(key)))
+        index = {}
+        for _, name, ucum_code in sorted(ranked):
+            index.setdefault(name, ucum_code)
+        return index
+
+    def ucum_cache_clear(self) -> None:
+        """Clear the from_ucum, error, ucum_converter and to_ucum caches."""
+        self._ucum_cache.clear()
+        self._ucum_errors.clear()
+        self._ucum_converters.clear()
+        self._ucum_formats.clear()
+
+    def ucum_error_cache_info(self):
+        """Return (hits, misses, maxsize, currsize) of the cache of invalid codes."""
+        return self._ucum_errors.info()
+
+    def ucum_cache_get(self, ucum_code, default=None):
+        """Return a copy of the cached from_ucum result or default if not cached."""
+        quantity = self._ucum_cache.get(ucum_code)
+        if quantity is None:
+            return default
+        return copy.copy(quantity)
+
+    def ucum_cache_prewarm(self, ucum_codes) -> None:
+        """Fill the from_ucum cache with the given UCUM codes."""
+        for ucum_code in ucum_codes:
+            self.from_ucum(ucum_code)
+
+
+def ucum_code_type_error(ucum_code) -> TypeError | None:
+    """Return the TypeError reported by the batch APIs for non-string codes."""
+    if isinstance(ucum_code, str):
+        return None
+    msg = f"UCUM code must be a string, got {ucum_code!r}."
+    return TypeError(msg)
+
+
+def _copy_exception(exc):
+    """Return a shallow copy of exc without traceback and context.
+
+    copy.copy does not work for lark exceptions, whose __init__ takes other
+    arguments than the args they store.
+    """
+    clone = exc.__class__.__new__(exc.__class__, *exc.args)
+    clone.__dict__.update(exc.__dict__)
+    clone.__cause__ = exc.__cause__
+    return clone
+
+
+def _ucum_factor(magnitude) -> tuple[int, int]:
+    """Return (factor, divisor) of UCUM integer factors equal to magnitude."""
+    if magnitude >= 1 and magnitude == int(magnitude):
+        return int(magnitude), 1
+    if 0 < magnitude < 1:
+        divisor = round(1 / magnitude)
+        if math.isclose(divisor * magnitude, 1, rel_tol=1e-9):
+            return 1, divisor
+    msg = f"Magnitude {magnitude!r} is not expressible by UCUM integer factors."
+    raise ValueError(msg)
+
+
+# === worker functions for from_ucum_many and find_matching_pint_definitions ===
+
+_worker_registry = None
+
+
+def _init_ucum_worker(cache_folder=None, ucum_engine="lalr", parser_cache=None):
+    global _worker_registry  # noqa: PLW0603
+    _worker_registry = PintUcumRegistry(
+        ucum_cache_size=0,
+        ucum_engine=ucum_engine,
+        ucum_parser_cache=parser_cache,
+        cache_folder=cache_folder,
+    )
+
+
+_report_context = None
+
+
+def _init_mapping_report_worker(parser_cache=None):
+    global _report_context  # noqa: PLW0603
+    _report_context = _MappingReportContext(parser_cache)
+
+
+def _mapping_report_lines(entries):
+    """Compute the mapping report lines for (section, ucum_code) entries."""
+    return [_report_context.line(section, ucum_code) for section, ucum_code in entries]
+
+
+def _from_ucum_compact(ucum_codes):
+    """Convert UCUM codes to picklable (magnitude, unit items) or error messages.
+
+    Annotation-only codes (e.g. "{rbc}") are not converted to a quantity by
+    from_ucum; their result (a lark Token or a number) is returned as
+    (result, None).
+    """
+    results = []
+    for ucum_code in ucum_codes:
+        try:
+            quantity = _worker_registry.from_ucum(ucum_code)
+        except LarkError as exc:  # noqa: PERF203
+            results.append((None, str(exc)))
+        else:
+            if isinstance(quantity, _worker_registry.Quantity):
+                compact = (quantity.magnitude, dict(quantity.unit_items()))
+            else:
+                compact = (quantity, None)
+            results.append((compact, None))
+    return results
 
 
 def run_examples():  # pragma: no cover
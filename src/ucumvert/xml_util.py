@@ -1,3 +1,7 @@
+from __future__ import annotations
+
+import copy
+import functools
 from dataclasses import dataclass
 from pathlib import Path
 from xml.etree import ElementTree
@@ -5,10 +9,35 @@ from xml.etree import ElementTree
 UCUM_ESSENCE_FILE = Path(__file__).parent.absolute() / "vendor" / "ucum-essence.xml"
 
 # set to "Code" for case-sensitive and to "CODE" for case-insensitive units
+# The getters below use CODE_ATTRIB unless a code_attrib is passed explicitly.
 CODE_ATTRIB = "Code"
 
-tree = ElementTree.parse(UCUM_ESSENCE_FILE)  # noqa: S314
-root = tree.getroot()
+
+@functools.cache
+def get_tree() -> ElementTree.ElementTree:
+    """Parse ucum-essence.xml on first use."""
+    return ElementTree.parse(UCUM_ESSENCE_FILE)  # noqa: S314
+
+
+def get_root() -> ElementTree.Element:
+    return get_tree().getroot()
+
+
+def __getattr__(name):
+    # "tree" and "root" were module attributes parsed at import time.
+    if name == "tree":
+        return get_tree()
+    if name == "root":
+        return get_root()
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
+
+
+@functools.cache
+def _find_codes(xpath: str, code_attrib: str) -> tuple:
+    # The results depend on CODE_ATTRIB, so it is part of the cache key.
+    xpath = xpath.format(code_attrib=code_attrib)
+    return tuple(p.attrib[code_attrib] for p in get_root().findall(xpath))
 
 
 @dataclass
@@ -26,37 +55,56 @@ class UcumUnitDefinition:
     conversion_factor: float = float("Nan")
 
 
-def get_prefixes() -> list:
-    prefix_path = ".//{*}prefix[@" + CODE_ATTRIB + "]"
-    return [p.attrib[CODE_ATTRIB] for p in root.findall(prefix_path)]
+def get_prefixes(code_attrib: str | None = None) -> list:
+    return list(
+        _find_codes(".//{{*}}prefix[@{code_attrib}]", code_attrib or CODE_ATTRIB)
+    )
+
+
+def get_prefix_values(code_attrib: str | None = None) -> dict:
+    """Return a mapping of prefix codes to their values, e.g. {"k": "1e3", ...}."""
+    return dict(_get_prefix_values(code_attrib or CODE_ATTRIB))
+
+
+@functools.cache
+def _get_prefix_values(code_attrib: str) -> tuple:
+    return tuple(
+        (p.attrib[code_attrib], p.find("{*}value").attrib["value"])
+        for p in get_root().findall(".//{*}prefix[@" + code_attrib + "]")
+    )
+
+
+def get_units(code_attrib: str | None = None) -> list:
+    return list(_find_codes(".//{{*}}unit[@{code_attrib}]", code_attrib or CODE_ATTRIB))
 
 
-def get_units() -> list:
-    units = []
-    for unit in root.findall(".//{*}unit[@" + CODE_ATTRIB + "]"):
-        cs = unit.attrib[CODE_ATTRIB]
-        units.append(cs)
-    return units
+def get_metric_units(code_attrib: str | None = None) -> list:
+    xpath = ".//{{*}}unit[@{code_attrib}][@isMetric='yes']"
+    return list(_find_codes(xpath, code_attrib or CODE_ATTRIB))
 
 
-def get_metric_units() -> list:
-    xpath = ".//{*}unit[@" + CODE_ATTRIB + "][@isMetric='yes']"
-    return [p.attrib[CODE_ATTRIB] for p in root.findall(xpath)]
+def get_non_metric_units(code_attrib: str | None = None) -> list:
+    xpath = ".//{{*}}unit[@{code_attrib}][@isMetric='no']"
+    return list(_find_codes(xpath, code_attrib or CODE_ATTRIB))
 
 
-def get_non_metric_units() -> list:
-    xpath = ".//{*}unit[@" + CODE_ATTRIB + "][@isMetric='no']"
-    return [p.attrib[CODE_ATTRIB] for p in root.findall(xpath)]
+def get_base_units(code_attrib: str | None = None) -> list:
+    return list(
+        _find_codes(".//{{*}}base-unit[@{code_attrib}]", code_attrib or CODE_ATTRIB)
+    )
 
 
-def get_base_units() -> list:
-    xpath = ".//{*}base-unit[@" + CODE_ATTRIB + "]"
-    return [p.attrib[CODE_ATTRIB] for p in root.findall(xpath)]
+def get_units_with_full_definition(code_attrib: str | None = None) -> list:
+    return [
+        copy.copy(u)
+        for u in _get_units_with_full_definition(code_attrib or CODE_ATTRIB)
+    ]
 
 
-def get_units_with_full_definition() -> list:
+@functools.cache
+def _get_units_with_full_definition(code_attrib: str) -> tuple:
     data = []
-    for el in root.findall(".//{*}unit[@" + CODE_ATTRIB + "]"):
+    for el in get_root().findall(".//{*}unit[@" + code_attrib + "]"):
         el_data = dict(el.items())
         # rename some keys
         el_data["code_ci"] = el_data.pop("CODE", "")
@@ -84,7 +132,7 @@ def get_units_with_full_definition() -> list:
         el_data["property_"] = el_data.pop("property", "")
         data.append(UcumUnitDefinition(**el_data))
 
-    return data
+    return tuple(data)
 
 
 if __name__ == "__main__":
@@ -12,6 +12,14 @@ def ucum_parser():
     return get_ucum_parser()
 
 
+@pytest.fixture(scope="session")
+def ucum_parser_earley():
+    """Reference Earley parser"""
+    from ucumvert.parser import get_ucum_parser
+
+    return get_ucum_parser(engine="earley")
+
+
 @pytest.fixture(scope="session")
 def ureg_std():
     import pint
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from lark import LarkError
+from lark.exceptions import UnexpectedCharacters
+
+from ucumvert import AsyncUcumRegistry, PintUcumRegistry
+
+
+@pytest.fixture
+def areg():
+    return AsyncUcumRegistry(PintUcumRegistry())
+
+
+def test_async_from_ucum(areg):
+    async def main():
+        q1 = await areg.from_ucum("mg/dL")
+        q2 = await areg.from_ucum("mg/dL")  # served inline from the cache
+        return q1, q2
+
+    q1, q2 = asyncio.run(main())
+    assert q1 == q2 == areg.ureg("mg/dL")
+    assert q1 is not q2
+    info = areg.ureg.ucum_cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_async_from_ucum_invalid(areg):
+    with pytest.raises(LarkError):
+        asyncio.run(areg.from_ucum("bars"))
+
+
+def test_async_from_ucum_cached_inline(monkeypatch):
+    ureg = PintUcumRegistry(ucum_stats=True)
+    areg = AsyncUcumRegistry(ureg)
+    asyncio.run(areg.from_ucum("mg/dL"))
+    with pytest.raises(UnexpectedCharacters):
+        asyncio.run(areg.from_ucum("bars"))
+
+    async def no_executor(ucum_code):
+        msg = f"{ucum_code!r} was sent to the executor"
+        raise AssertionError(msg)
+
+    monkeypatch.setattr(areg, "_convert", no_executor)
+    assert asyncio.run(areg.from_ucum("mg/dL")) == ureg("mg/dL")
+    with pytest.raises(UnexpectedCharacters):
+        asyncio.run(areg.from_ucum("bars"))
+    counters = ureg.ucum_stats.counters
+    assert counters["calls"] == 4  # noqa: PLR2004
+    assert (counters["hits"], counters["error_cache_hits"]) == (1, 1)
+
+
+def test_async_from_ucum_coalesces_requests(monkeypatch):
+    ureg = PintUcumRegistry()
+    calls = []
+    convert = ureg._from_ucum_uncached  # noqa: SLF001
+
+    def slow_convert(ucum_code):
+        calls.append(threading.get_ident())
+        time.sleep(0.05)
+        return convert(ucum_code)
+
+    monkeypatch.setattr(ureg, "_from_ucum_uncached", slow_convert)
+
+    async def main():
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            areg = AsyncUcumRegistry(ureg, executor=executor)
+            return await asyncio.gather(*(areg.from_ucum("kg/m2") for _ in range(10)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1  # one conversion for all concurrent requests
+    assert all(q == ureg("kg/m**2") for q in results)
+    assert len({id(q) for q in results}) == len(results)  # each got a copy
+
+
+def test_async_from_ucum_coalesced_errors_are_copies(monkeypatch):
+    ureg = PintUcumRegistry()
+    convert = ureg._from_ucum_uncached  # noqa: SLF001
+
+    def slow_convert(ucum_code):
+        time.sleep(0.05)
+        return convert(ucum_code)
+
+    monkeypatch.setattr(ureg, "_from_ucum_uncached", slow_convert)
+
+    async def main():
+        areg = AsyncUcumRegistry(ureg)
+        requests = (areg.from_ucum("bars") for _ in range(3))
+        return await asyncio.gather(*requests, return_exceptions=True)
+
+    errors = asyncio.run(main())
+    assert all(isinstance(error, UnexpectedCharacters) for error in errors)
+    assert len({id(error) for error in errors}) == len(errors)
+    assert all(error.__context__ is None for error in errors)
+
+
+def test_async_from_ucum_many(areg):
+    codes = ["mg/dL", "g/L", "mg/dL", "bars", None, "g/L"]
+    result = asyncio.run(areg.from_ucum_many(codes))
+    assert result.quantities[0] == areg.ureg("mg/dL")
+    assert result.quantities[2] is result.quantities[0]
+    assert isinstance(result.errors[3], LarkError)
+    assert isinstance(result.errors[4], TypeError)
+    assert result.error_mask == [False, False, False, True, True, False]
+
+
+def test_non_string_codes_same_error_in_all_batch_apis(areg):
+    pytest.importorskip("numpy")
+    ureg = areg.ureg
+    errors = [
+        ureg.from_ucum_many([None]).errors[0],
+        ureg.convert_ucum_column([1.0], [None], "m").errors[None],
+        asyncio.run(areg.from_ucum_many([None])).errors[0],
+    ]
+    assert all(isinstance(error, TypeError) for error in errors)
+    assert {str(error) for error in errors} == {"UCUM code must be a string, got None."}
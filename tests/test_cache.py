@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ucumvert.cache import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache.get("a") == 1  # "a" is now most recently used
+    cache["c"] = 3
+    assert "b" not in cache
+    assert "a" in cache
+    assert "c" in cache
+    assert cache.get("b") is None
+    assert cache.info() == (1, 1, 2, 2)
+
+
+def test_lru_cache_unbounded():
+    cache = LRUCache(maxsize=None)
+    for i in range(1000):
+        cache[i] = i
+    assert len(cache) == 1000  # noqa: PLR2004
+
+
+def test_lru_cache_invalid_maxsize():
+    with pytest.raises(ValueError, match="maxsize"):
+        LRUCache(maxsize=-1)
+
+
+def test_lru_cache_threads():
+    cache = LRUCache(maxsize=8)
+
+    def worker(offset):
+        for i in range(2000):
+            key = (offset + i) % 20
+            if cache.get(key) is None:
+                cache[key] = key
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(worker, range(8)))
+    info = cache.info()
+    assert info.hits + info.misses == 8 * 2000
+    assert info.currsize == 8  # noqa: PLR2004
@@ -0,0 +1,168 @@
+import json
+import pickle
+from fractions import Fraction
+
+import pytest
+from lark import LarkError
+from test_parser import ucum_examples_valid
+
+from ucumvert import PintUcumRegistry, UcumUnit, base_unit_form, canonical_form
+from ucumvert.canonical import (
+    BASE_UNIT_TABLE_FILE,
+    UcumToCanonicalTransformer,
+    build_base_unit_table,
+    conversion_factor,
+    update_base_unit_table_file,
+)
+from ucumvert.parser import GRAMMAR_FILE
+from ucumvert.xml_util import get_units
+
+
+@pytest.mark.parametrize(
+    ("code1", "code2"),
+    [
+        ("m/s", "m.s-1"),
+        ("m/s", "s-1.m{x}"),
+        ("kg.m/s2", "m.kg.s-2"),
+        ("mg/dL{total}", "mg.dL-1"),
+        ("m.m-1", "1"),
+        ("/{cells}", "{count}"),
+    ],
+)
+def test_canonical_form_equal(code1, code2):
+    assert canonical_form(code1) == canonical_form(code2)
+    assert hash(canonical_form(code1)) == hash(canonical_form(code2))
+
+
+def test_canonical_form_keeps_prefixes():
+    assert canonical_form("km") != canonical_form("m")
+    assert canonical_form("/1000.km2").factor == Fraction(1, 1000)
+    assert canonical_form("/1000.km2").atoms == (("k", "m", -2),)
+
+
+def test_canonical_transformer_lark_tree(ucum_parser):
+    tree = ucum_parser.parse("4.[pi].10*-7.N/A2")
+    factor, atoms = UcumToCanonicalTransformer().transform(tree)
+    assert factor == 4  # noqa: PLR2004
+    assert atoms == {("", "[pi]"): 1, ("", "10*"): -7, ("", "N"): 1, ("", "A"): -2}
+
+
+@pytest.mark.parametrize(
+    ("code1", "code2", "factor"),
+    [
+        ("km/h", "m/s", Fraction(5, 18)),
+        ("N", "kg.m/s2", Fraction(1)),
+        ("L", "dm3", Fraction(1)),
+        ("[in_i]", "cm", Fraction(254, 100)),
+        ("10*3/uL", "10*9/L", Fraction(1)),
+        ("%", "1", Fraction(1, 100)),
+        ("m[iU]", "[IU]", Fraction(1, 1000)),
+    ],
+)
+def test_base_unit_form_commensurable(code1, code2, factor):
+    form1, form2 = base_unit_form(code1), base_unit_form(code2)
+    assert form1.dimensions == form2.dimensions
+    assert form1.factor / form2.factor == factor
+
+
+def test_base_unit_form_special_units():
+    assert base_unit_form("Cel").dimensions == (("Cel", 1),)
+    assert base_unit_form("Cel").dimensions != base_unit_form("K").dimensions
+    assert base_unit_form("[pH]").dimensions == (("[pH]", 1),)
+
+
+@pytest.mark.parametrize("ucum_code", get_units())
+def test_base_unit_form_all_units(ucum_code):
+    base_unit_form(ucum_code)
+
+
+@pytest.mark.parametrize("ucum_code", ucum_examples_valid.values())
+def test_canonical_form_official_examples(ucum_code):
+    if ucum_code == "Torr":
+        pytest.skip("Torr is not defined in official ucum-essence.xml")
+    assert hash(canonical_form(ucum_code)) == hash(canonical_form(ucum_code))
+    base_unit_form(ucum_code)
+
+
+def test_canonical_form_invalid():
+    with pytest.raises(LarkError):
+        canonical_form("m//s")
+
+
+def test_base_unit_table_up_to_date(tmp_path):
+    table_file = tmp_path / "ucum_base_units.json"
+    update_base_unit_table_file(table_file)
+    assert table_file.read_text() == BASE_UNIT_TABLE_FILE.read_text()
+    assert json.loads(table_file.read_text()) == build_base_unit_table()
+
+
+def test_base_unit_table_uses_given_grammar(tmp_path, monkeypatch):
+    grammar_file = tmp_path / "ucum_grammar.lark"
+    grammar_file.write_text(GRAMMAR_FILE.read_text())
+
+    def shared_parser(*_args, **_kwargs):
+        msg = "the shared parser of the shipped grammar must not be used"
+        raise AssertionError(msg)
+
+    monkeypatch.setattr("ucumvert.parser.get_shared_ucum_parser", shared_parser)
+    table = build_base_unit_table(grammar_file)
+    assert table == json.loads(BASE_UNIT_TABLE_FILE.read_text())
+
+
+@pytest.mark.parametrize(
+    ("source", "target", "factor"),
+    [
+        ("km/h", "m/s", Fraction(5, 18)),
+        ("mg/dL", "g/L", Fraction(1, 100)),
+        ("[lb_av]", "kg", Fraction(45359237, 100000000)),
+        ("mmol/L", "umol/mL", Fraction(1)),
+    ],
+)
+def test_conversion_factor(source, target, factor):
+    assert conversion_factor(source, target) == factor
+
+
+@pytest.mark.parametrize(
+    ("source", "target"), [("mg", "m"), ("Cel", "K"), ("K", "mCel")]
+)
+def test_conversion_factor_invalid(source, target):
+    with pytest.raises(ValueError, match="UCUM code"):
+        conversion_factor(source, target)
+
+
+def test_ucum_unit_interned():
+    unit = UcumUnit("mg/dL")
+    assert UcumUnit("mg/" + "dL") is unit
+    assert unit.code == "mg/dL"
+    assert str(unit) == "mg/dL"
+    assert repr(unit) == "UcumUnit('mg/dL')"
+    assert unit.canonical == canonical_form("mg/dL")
+    assert unit.base_unit_form == base_unit_form("mg/dL")
+    assert pickle.loads(pickle.dumps(unit)) is unit  # noqa: S301
+
+
+def test_ucum_unit_equality():
+    assert UcumUnit("m/s") == UcumUnit("m.s-1")
+    assert UcumUnit("m/s") is not UcumUnit("m.s-1")
+    assert len({UcumUnit("m/s"), UcumUnit("m.s-1"), UcumUnit("km/h")}) == 2  # noqa: PLR2004
+    assert UcumUnit("m") != "m"
+
+
+def test_ucum_unit_immutable():
+    unit = UcumUnit("kg")
+    with pytest.raises(AttributeError, match="immutable"):
+        unit.code = "g"
+    with pytest.raises(AttributeError):
+        unit.extra = 1
+    with pytest.raises(AttributeError, match="immutable"):
+        del unit.code
+
+
+def test_ucum_unit_invalid():
+    with pytest.raises(LarkError):
+        UcumUnit("bars")
+
+
+def test_ucum_unit_to_pint():
+    ureg = PintUcumRegistry()
+    assert UcumUnit("mg/dL").to_pint(ureg) == ureg.from_ucum("mg/dL")
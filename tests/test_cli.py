@@ -1,10 +1,12 @@
+import io
+import json
 import logging
 import os
 from unittest import mock
 
 import pytest
 
-from ucumvert.cli import main_cli, run_cli_app
+from ucumvert.cli import main_cli, run_cli_app, stream_records
 
 
 def test_run_cli_app_no_args_entrypoint(monkeypatch, capsys):
@@ -41,11 +43,19 @@ def test_run_mapping_report_generation(tmp_path):
     assert expected.exists()
 
 
+def test_run_mapping_report_incremental(tmp_path):
+    dst = tmp_path / "mapping.txt"
+    main_cli(["--mapping_report", str(dst), "--incremental", "--jobs", "2"])
+    assert dst.exists()
+    assert (tmp_path / "mapping.json").exists()
+
+
 def test_run_grammar_update(tmp_path):
     dst = tmp_path / "ucum_grammar.lark"
     main_cli(["--grammar_update", str(dst)])
     expected = dst
     assert expected.exists()
+    assert (tmp_path / "ucum_base_units.json").exists()
 
 
 @pytest.mark.parametrize(("pydot_installed"), [(True), (False)])
@@ -68,3 +78,55 @@ def test_valid_config(caplog, tmp_path):
     with caplog.at_level(logging.ERROR):
         main_cli(["-g", str(dst)])
     assert not caplog.text
+
+
+def test_convert_file(tmp_path, capsys):
+    src = tmp_path / "codes.txt"
+    src.write_text("m/s\nmg/dL\nbars\nm/s\n{rbc}\n{a}.{b}\n")
+    main_cli(["convert", str(src)])
+    captured = capsys.readouterr()
+    lines = captured.out.splitlines()
+    assert lines[0] == "ucum_code\tpint\tcanonical\terror"
+    assert lines[1] == "m/s\tmeter / second\tm.s-1\t"
+    assert lines[3].startswith("bars\t\t\tNo terminal matches 's'")
+    assert lines[4] == lines[1]
+    assert lines[5] == "{rbc}\t1\t1\t"
+    assert lines[6] == "{a}.{b}\t1\t1\t"
+    assert "Processed 6 UCUM codes" in captured.err
+    assert "codes/s" in captured.err
+
+
+def test_validate_stdin_jsonl(monkeypatch, capsys):
+    monkeypatch.setattr("sys.stdin", io.StringIO("kg.m/s2\n[pH]\nxyz\n"))
+    main_cli(["validate", "--format", "jsonl"])
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [r["valid"] for r in records] == [True, True, False]
+    assert records[0]["canonical"] == "m.s-2.kg"
+    assert records[0]["error"] is None
+    assert "xyz" in records[2]["error"]
+
+
+def test_validate_csv_column(tmp_path, capsys):
+    src = tmp_path / "data.tsv"
+    src.write_text("id\tunit\n1\tmg/dL\n2\tmmol/L\n")
+    main_cli(["validate", str(src), "--column", "unit", "--delimiter", "\\t"])
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split("\t")[0] for line in lines[1:]] == ["mg/dL", "mmol/L"]
+    main_cli(["validate", str(src), "-c", "2", "-d", "\t"])
+    assert capsys.readouterr().out.splitlines() == lines
+    with pytest.raises(ValueError, match="Column 'units' not found"):
+        main_cli(["validate", str(src), "-c", "units", "-d", "\t"])
+    with pytest.raises(ValueError, match="Column numbers start at 1, got '0'"):
+        main_cli(["validate", str(src), "-c", "0", "-d", "\t"])
+
+
+def test_stream_records_deduplicates():
+    calls = []
+
+    def make_record(ucum_code):
+        calls.append(ucum_code)
+        return {"ucum_code": ucum_code}
+
+    records = list(stream_records(iter(["m", "g", "m", "m"]), make_record, 1))
+    assert [r["ucum_code"] for r in records] == ["m", "g", "m", "m"]
+    assert calls == ["m", "g", "m"]  # "m" was evicted by "g"
@@ -0,0 +1,58 @@
+import pytest
+from lark import LarkError
+from test_parser import ucum_examples_valid
+
+from ucumvert import (
+    PintUcumRegistry,
+    UcumToPintStrTransformer,
+    UcumToPintTransformer,
+)
+from ucumvert.parser import get_ucum_parser
+
+
+@pytest.fixture(scope="module")
+def descent_parser():
+    return get_ucum_parser(engine="descent")
+
+
+@pytest.mark.parametrize(
+    "ucum_code",
+    ucum_examples_valid.values(),
+    ids=[" ".join(kv) for kv in ucum_examples_valid.items()],
+)
+def test_descent_official_examples(
+    descent_parser, ucum_parser, ureg_ucumvert, ucum_code
+):
+    if ucum_code == "Torr":
+        pytest.skip("Torr is not defined in official ucum-essence.xml")
+    parsed_data = ucum_parser.parse(ucum_code)
+    # The pint strings document each call of the transformer methods.
+    transformer = UcumToPintStrTransformer()
+    assert descent_parser.transform(
+        ucum_code, transformer, fallback=False
+    ) == transformer.transform(parsed_data)
+    if ucum_code == "[pH]":
+        pytest.skip("[pH] = pH_value is not defined in pint due to an issue.")
+    transformer = UcumToPintTransformer(ureg_ucumvert)
+    assert descent_parser.transform(
+        ucum_code, transformer, fallback=False
+    ) == transformer.transform(parsed_data)
+
+
+@pytest.mark.parametrize(
+    "ucum_code",
+    ["bars", "2mg", ".m", "m.", "m/", "{red}m", "m(/s)", "(m/s)2", "m{a}{b}", "da"],
+)
+def test_descent_invalid_ucum_codes(descent_parser, ucum_code):
+    transformer = UcumToPintStrTransformer()
+    with pytest.raises(ValueError, match="Invalid UCUM code"):
+        descent_parser.transform(ucum_code, transformer, fallback=False)
+    with pytest.raises(LarkError):  # error of the lark parser
+        descent_parser.transform(ucum_code, transformer)
+
+
+def test_descent_unitregistry():
+    ureg = PintUcumRegistry(ucum_engine="descent")
+    assert ureg.from_ucum("m/s2.kg") == ureg("kg*m/s**2")
+    assert ureg.from_ucum("m[IU]/L") == ureg("milliinternational_unit/liter")
+    assert ureg.from_ucum_many(["g/L", "bars"]).error_mask == [False, True]
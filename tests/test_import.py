@@ -0,0 +1,29 @@
+import subprocess
+import sys
+
+import ucumvert
+from ucumvert import xml_util
+from ucumvert.ucum_pint import PintUcumRegistry
+
+
+def test_import_is_lazy():
+    """Guard import time: "import ucumvert" must not load lark, pint or the XML."""
+    code = (
+        "import sys, ucumvert; "
+        "print(' '.join(m for m in sys.modules "
+        "if m.split('.')[0] in ('lark', 'pint') or m.startswith('ucumvert.')))"
+    )
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert set(result.stdout.split()) <= {"ucumvert._version"}
+
+
+def test_lazy_attributes():
+    assert ucumvert.PintUcumRegistry is PintUcumRegistry
+    assert set(ucumvert.__all__) <= set(dir(ucumvert))
+
+
+def test_xml_util_legacy_root():
+    assert xml_util.root is xml_util.get_root()
+    assert xml_util.tree.getroot() is xml_util.root
@@ -0,0 +1,76 @@
+import lark
+import pytest
+from lark import Token
+from test_parser import ucum_examples_valid
+
+from ucumvert.lexer import UcumTokenizer
+from ucumvert.parser import UcumParser, get_atom_table, get_ucum_parser
+
+
+@pytest.fixture(scope="module")
+def ucum_grammar(ucum_parser):
+    return ucum_parser.ucum_grammar
+
+
+@pytest.fixture(scope="module")
+def tokenizer(ucum_grammar):
+    return UcumTokenizer(get_atom_table(ucum_grammar))
+
+
+@pytest.fixture(scope="module")
+def ucum_parser_regex(ucum_grammar):
+    return UcumParser(ucum_grammar, lexer="regex")
+
+
+@pytest.mark.parametrize(
+    "ucum_code",
+    ucum_examples_valid.values(),
+    ids=[" ".join(kv) for kv in ucum_examples_valid.items()],
+)
+def test_tokenizer_official_examples(
+    tokenizer, ucum_parser_earley, ucum_parser_regex, ucum_code
+):
+    if ucum_code == "Torr":
+        pytest.skip("Torr is not defined in official ucum-essence.xml")
+    tree = ucum_parser_earley.parse(ucum_code)
+    expected = [
+        (t.type, str(t)) for t in tree.scan_values(lambda v: isinstance(v, Token))
+    ]
+    tokens = [
+        (t.type, str(t))
+        for t in tokenizer.tokenize(ucum_code)
+        if t.type not in ("LPAR", "RPAR")  # not kept in the tree
+    ]
+    assert tokens == expected
+    assert ucum_parser_regex.lalr.parse(ucum_code) == tree
+
+
+def test_tokenizer_longest_match(tokenizer):
+    tokens = list(tokenizer.tokenize("mol.cd/dar.10*-3.att"))
+    assert [(t.type, str(t)) for t in tokens] == [
+        ("UNIT_METRIC", "mol"),
+        ("OPERATOR", "."),
+        ("UNIT_METRIC", "cd"),
+        ("OPERATOR", "/"),
+        ("PREFIX_SHORT", "d"),
+        ("UNIT_METRIC", "ar"),
+        ("OPERATOR", "."),
+        ("UNIT_NON_METRIC", "10*"),
+        ("EXPONENT", "-3"),
+        ("OPERATOR", "."),
+        ("UNIT_NON_METRIC", "att"),
+    ]
+    assert tokens[5].start_pos == 8  # noqa: PLR2004
+
+
+@pytest.mark.parametrize(
+    "ucum_code", ["bars", "m0", "m+", "{a", "m{a{b}", "m{a b}", "0", "da"]
+)
+def test_tokenizer_invalid(ucum_parser, ucum_code):
+    with pytest.raises(lark.exceptions.UnexpectedInput):
+        ucum_parser.lalr.parse(ucum_code)
+
+
+def test_unknown_lexer():
+    with pytest.raises(ValueError, match="Unknown lexer"):
+        UcumParser(get_ucum_parser().ucum_grammar, lexer="glr")
@@ -1,3 +1,4 @@
+import json
 from pathlib import Path
 
 import lark
@@ -5,6 +6,19 @@ import pytest
 from lark import Token
 from lark.tree import Tree
 
+from ucumvert import xml_util
+from ucumvert.parser import (
+    CI_TO_CS_TABLE_FILE,
+    GRAMMAR_FILE_CI,
+    build_ci_to_cs_table,
+    get_parser_cache_default,
+    get_shared_ucum_parser,
+    get_terminal_literals,
+    get_ucum_parser,
+    ucum_case_insensitive_to_cs,
+    update_lark_ucum_grammar_file,
+)
+
 datadir = Path(__file__).resolve().parents[1] / "src" / "ucumvert" / "vendor"
 
 with Path(datadir / "ucum_examples.tsv").open(encoding="utf8") as f:
@@ -73,3 +87,141 @@ def test_ucum_parser_metric(ucum_parser):
         [Tree(Token("RULE", "simple_unit"), [Token("UNIT_METRIC", "m")])],
     )
     assert tree == expected
+
+
+@pytest.mark.parametrize(
+    "ucum_code",
+    ucum_examples_valid.values(),
+    ids=[" ".join(kv) for kv in ucum_examples_valid.items()],
+)
+def test_ucum_parser_lalr_equals_earley(ucum_parser, ucum_parser_earley, ucum_code):
+    if ucum_code == "Torr":
+        pytest.skip("Torr is not defined in official ucum-essence.xml")
+    # Parse with LALR only (no fallback) and compare with the reference parser.
+    assert ucum_parser.lalr.parse(ucum_code) == ucum_parser_earley.parse(ucum_code)
+
+
+@pytest.mark.parametrize(
+    "ucum_code",
+    ["bars", "2mg", "m{ann1}{ann2}", "da", "(m/s)2"],
+)
+def test_ucum_parser_lalr_rejects_invalid(ucum_parser, ucum_code):
+    with pytest.raises(lark.exceptions.UnexpectedInput):
+        ucum_parser.lalr.parse(ucum_code)
+
+
+def test_ucum_parser_unknown_engine():
+    with pytest.raises(ValueError, match="Unknown parser engine"):
+        get_ucum_parser(engine="cyk")
+
+
+def test_ucum_parser_cache_file(tmp_path, ucum_parser_earley):
+    cache_file = tmp_path / "ucum_parser.cache"
+    parser_fresh = get_ucum_parser(cache=cache_file)
+    assert cache_file.exists()
+    parser_cached = get_ucum_parser(cache=cache_file)
+    for ucum_code in ("kg", "dar", "(/s2{a}.(10{f}.m)){t}", "10*3/uL"):
+        expected = ucum_parser_earley.parse(ucum_code)
+        assert parser_fresh.lalr.parse(ucum_code) == expected
+        assert parser_cached.lalr.parse(ucum_code) == expected
+
+
+def test_ucum_parser_cache_default_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("UCUMVERT_CACHE_DIR", str(tmp_path / "cache"))
+    get_ucum_parser(cache=True)
+    cache_files = list((tmp_path / "cache").glob("ucum_parser_*.cache"))
+    assert len(cache_files) == 1
+    assert lark.__version__ in cache_files[0].name
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [("", False), ("0", False), ("no", False), ("1", True), (" True ", True)],
+)
+def test_parser_cache_default(tmp_path, monkeypatch, value, expected):
+    monkeypatch.setenv("UCUMVERT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("UCUMVERT_PARSER_CACHE", value)
+    assert get_parser_cache_default() is expected
+    if expected:
+        assert get_shared_ucum_parser() is get_shared_ucum_parser(cache=True)
+    else:
+        assert get_shared_ucum_parser() is get_shared_ucum_parser(cache=False)
+
+
+def test_shared_ucum_parser_cache_file(tmp_path):
+    cache_file = tmp_path / "ucum_parser.cache"
+    parser = get_shared_ucum_parser(cache=cache_file)
+    assert cache_file.exists()
+    assert parser is get_shared_ucum_parser(cache=cache_file)
+    assert parser is not get_shared_ucum_parser(cache=False)
+
+
+@pytest.mark.parametrize("engine", ["earley", "lalr", "descent"])
+def test_ucum_parser_case_insensitive(engine):
+    parser_ci = get_ucum_parser(engine=engine, case_sensitive=False)
+    tree = parser_ci.parse("MG/DL")
+    assert [str(t) for t in tree.scan_values(lambda _: True)] == [
+        "M",
+        "G",
+        "/",
+        "D",
+        "L",
+    ]
+    with pytest.raises(lark.exceptions.UnexpectedInput):
+        parser_ci.parse("mg/dL")
+
+
+def test_shared_ucum_parsers_side_by_side():
+    parser_cs = get_shared_ucum_parser()
+    parser_ci = get_shared_ucum_parser(case_sensitive=False)
+    assert parser_cs is get_shared_ucum_parser()
+    assert parser_ci is get_shared_ucum_parser(case_sensitive=False)
+    assert parser_cs is not parser_ci
+    assert parser_cs.parse("mg/dL")
+    assert parser_ci.parse("MG/DL")
+    assert xml_util.CODE_ATTRIB == "Code"
+
+
+def test_ucum_grammar_ci_up_to_date(tmp_path):
+    grammar_file = tmp_path / "ucum_grammar_ci.lark"
+    update_lark_ucum_grammar_file(grammar_file=grammar_file, case_sensitive=False)
+    assert get_terminal_literals(grammar_file.read_text()) == get_terminal_literals(
+        GRAMMAR_FILE_CI.read_text()
+    )
+    table_file = tmp_path / "ucum_ci_to_cs.json"
+    assert json.loads(table_file.read_text()) == build_ci_to_cs_table()
+    assert table_file.read_text() == CI_TO_CS_TABLE_FILE.read_text()
+
+
+@pytest.mark.parametrize(
+    ("ucum_code_ci", "ucum_code_cs"),
+    [
+        ("MG/DL", "mg/dL"),
+        ("mg/dl", "mg/dL"),
+        ("UMOL/L", "umol/L"),
+        ("KG.M2/S2", "kg.m2/s2"),
+        ("10*3/UL", "10*3/uL"),
+        ("4.[PI].10*-7.N/A2", "4.[pi].10*-7.N/A2"),
+        ("/(8.HR){Shift}", "/(8.h){Shift}"),  # annotations keep their case
+        ("PAL", "Pa"),
+        ("MAM", "Mm"),  # mega-meter
+        ("DAR", "dar"),  # deci-are
+        ("[IU]/ML", "[IU]/mL"),
+        ("[DEGR]", "[degR]"),
+        ("CEL", "Cel"),
+        ("XYZ/L", "XYZ/L"),  # unknown atoms are left for the parser to reject
+    ],
+)
+def test_ucum_case_insensitive_to_cs(ucum_code_ci, ucum_code_cs):
+    assert ucum_case_insensitive_to_cs(ucum_code_ci) == ucum_code_cs
+
+
+def test_ucum_case_insensitive_to_cs_all_atoms():
+    table = build_ci_to_cs_table()
+    parser_cs = get_shared_ucum_parser()
+    for units in (table["metric"], table["non_metric"]):
+        for unit_ci, unit_cs in units.items():
+            assert ucum_case_insensitive_to_cs(unit_ci) == unit_cs
+            assert parser_cs.parse(unit_cs)
+    for prefix_ci, prefix_cs in table["prefixes"].items():
+        assert ucum_case_insensitive_to_cs(prefix_ci + "MOL") == prefix_cs + "mol"
@@ -0,0 +1,36 @@
+import logging
+
+from ucumvert.stats import BUCKET_BOUNDS, TimingHistogram, UcumStats, stage_timer
+
+
+def test_timing_histogram():
+    histogram = TimingHistogram()
+    for seconds in (3e-6, 4e-6, 1e-3, 2.5):
+        histogram.add(seconds)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 4  # noqa: PLR2004
+    assert snapshot["max"] == 2.5  # noqa: PLR2004
+    assert snapshot["histogram"] == {"5e-06": 2, "0.001": 1, "inf": 1}
+    assert len(histogram.buckets) == len(BUCKET_BOUNDS) + 1
+
+
+def test_stats_slowest(caplog):
+    stats = UcumStats(slowest=2)
+    for ucum_code, seconds in (("m", 1e-5), ("kg", 3e-5), ("mg/dL", 2e-5)):
+        stats.add_code_time(ucum_code, seconds)
+    assert stats.slowest_codes() == [("kg", 3e-5), ("mg/dL", 2e-5)]
+    assert stats.stages["total"].count == 3  # noqa: PLR2004
+    with caplog.at_level(logging.INFO, logger="ucumvert.stats"):
+        stats.log_slowest()
+    assert [r.getMessage().split()[-1] for r in caplog.records] == ["kg", "mg/dL"]
+    stats.reset()
+    assert stats.snapshot() == {"counters": {}, "stages": {}, "slowest": []}
+
+
+def test_stage_timer():
+    stats = UcumStats()
+    with stage_timer(stats, "parse"):
+        pass
+    with stage_timer(None, "parse"):
+        pass
+    assert stats.stages["parse"].count == 1
@@ -1,17 +1,27 @@
+import contextlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import pytest
 from lark import LarkError
-from pint import UnitRegistry
+from lark.exceptions import UnexpectedCharacters, VisitError
+from pint import DimensionalityError, UnitRegistry
 from test_parser import ucum_examples_valid
 
 from ucumvert import (
     PintUcumRegistry,
+    UcumPreprocessor,
     UcumToPintStrTransformer,
     UcumToPintTransformer,
     ucum_preprocessor,
 )
-from ucumvert.ucum_pint import find_ucum_codes_that_need_mapping
+from ucumvert.stats import UcumStats
+from ucumvert.ucum_pint import (
+    find_matching_pint_definitions,
+    find_ucum_codes_that_need_mapping,
+)
 from ucumvert.xml_util import get_metric_units, get_non_metric_units
 
 
@@ -111,6 +121,16 @@ def test_ucum_preprocessor():
         ureg_ucumvert("degC")
 
 
+def test_ucum_preprocessor_shared_parser(ucum_parser):
+    preprocessor = UcumPreprocessor(ucum_parser, cache_size=8)
+    assert preprocessor("m.kg") == "(((m) * (kg)))"
+    assert preprocessor("m.kg") == "(((m) * (kg)))"
+    assert preprocessor.ucum_parser is ucum_parser
+    assert preprocessor.cache_info() == (1, 1, 8, 1)
+    preprocessor.cache_clear()
+    assert preprocessor.cache_info().currsize == 0
+
+
 def test_ucum_unitregistry():
     ureg = PintUcumRegistry()
     assert ureg.from_ucum("m.kg") == ureg("m*kg")
@@ -126,3 +146,411 @@ def test_prefix_with_unit_that_is_also_a_prefix_issue24(ucum_parser, ureg_ucumve
 
     result_str = UcumToPintStrTransformer().transform(parsed_data)
     assert result_str == "(((m[IU]) / (L)))"
+
+
+def test_ucum_unitregistry_cache():
+    ureg = PintUcumRegistry(ucum_cache_size=2)
+    q1 = ureg.from_ucum("m/s")
+    q2 = ureg.from_ucum("m/s")
+    assert q1 == q2
+    assert q1 is not q2  # cached results are copied
+    q2.ito("km/h")
+    assert ureg.from_ucum("m/s") == ureg("m/s")  # cache not modified by ito()
+    info = ureg.ucum_cache_info()
+    assert (info.hits, info.misses, info.maxsize, info.currsize) == (2, 1, 2, 1)
+
+    ureg.ucum_cache_prewarm(["kg", "Cel"])
+    assert ureg.ucum_cache_info().currsize == 2  # noqa: PLR2004 "m/s" was evicted
+    ureg.from_ucum("kg")
+    assert ureg.ucum_cache_info().hits == 3  # noqa: PLR2004
+
+    ureg.ucum_cache_clear()
+    assert ureg.ucum_cache_info() == (0, 0, 2, 0)
+
+
+def test_ucum_unitregistry_cache_parallel():
+    ureg = PintUcumRegistry()
+    result = ureg.from_ucum_many(["m/s", "m/s"], max_workers=2)
+    assert result.quantities[0] is result.quantities[1]
+    result.quantities[0].ito("km/h")
+    assert ureg.from_ucum("m/s") == ureg("m/s")  # cache not modified by ito()
+    assert str(ureg.from_ucum("m/s").units) == "meter / second"
+
+
+def test_ucum_unitregistry_define_clears_caches():
+    ureg = PintUcumRegistry()
+    ureg.to_ucum("meter")  # builds the reverse index of to_ucum
+    with pytest.raises(VisitError):
+        ureg.from_ucum("[pH]")  # pH_value is not defined in pint
+    ureg.define("pH_value = [pH_dim]")
+    assert ureg.from_ucum("[pH]") == ureg.Quantity(1, "pH_value")
+    assert ureg.to_ucum("pH_value") == "[pH]"
+    assert ureg.ucum_error_cache_info().currsize == 0
+
+
+def test_ucum_unitregistry_cache_disabled():
+    ureg = PintUcumRegistry(ucum_cache_size=0)
+    ureg.from_ucum("m/s")
+    ureg.from_ucum("m/s")
+    assert ureg.ucum_cache_info() == (0, 2, 0, 0)
+
+
+def test_ucum_unitregistry_from_ucum_many():
+    ureg = PintUcumRegistry()
+    codes = ["mg/dL", "g/L", "mg/dL", "bars", None, "g/L"]
+    result = ureg.from_ucum_many(iter(codes))
+    assert result.quantities[0] == ureg("mg/dL")
+    assert result.quantities[1] == ureg("g/L")
+    assert result.quantities[2] is result.quantities[0]  # parsed only once
+    assert result.quantities[3] is None
+    assert isinstance(result.errors[3], LarkError)
+    assert isinstance(result.errors[4], TypeError)
+    assert result.error_mask == [False, False, False, True, True, False]
+    assert ureg.ucum_cache_info().misses == 3  # noqa: PLR2004
+
+
+def test_ucum_unitregistry_from_ucum_many_parallel():
+    ureg = PintUcumRegistry()
+    codes = ["mg/dL", "g/L", "10*3/uL", "m[IU]/L", "bars", "mg/dL", 7]
+    codes += ["{rbc}", "{a}.{b}"]  # annotation-only codes are not quantities
+    expected = ureg.from_ucum_many(codes)
+    ureg.ucum_cache_clear()
+    result = ureg.from_ucum_many(codes, max_workers=2)
+    assert result.quantities == expected.quantities
+    assert result.error_mask == expected.error_mask
+    assert isinstance(result.errors[4], LarkError)
+    assert result.quantities[3].units == ureg.from_ucum("m[IU]/L").units
+    assert ureg.ucum_cache_info().currsize == 6  # noqa: PLR2004
+    with pytest.raises(UnexpectedCharacters):  # not the worker's LarkError
+        ureg.from_ucum("bars")
+
+
+def test_ucum_unitregistry_parser_cache(tmp_path):
+    cache_file = tmp_path / "ucum_parser.cache"
+    ureg = PintUcumRegistry(ucum_parser_cache=cache_file)
+    assert cache_file.exists()
+    result = ureg.from_ucum_many(["mg/dL", "bars"], max_workers=2)
+    assert result.quantities[0] == ureg("mg/dL")
+    assert result.error_mask == [False, True]
+
+
+def test_ucum_unitregistry_converter():
+    np = pytest.importorskip("numpy")
+    ureg = PintUcumRegistry()
+    values = np.array([0.0, 1.0, 100.0])
+
+    converter = ureg.ucum_converter("mg/dL", "g/L")
+    assert converter.factor == pytest.approx(0.01)
+    np.testing.assert_allclose(converter(values), [0.0, 0.01, 1.0])
+    assert ureg.ucum_converter("mg/dL", "g/L") is converter  # cached per pair
+
+    converter = ureg.ucum_converter("Cel", "[degF]")
+    assert converter.offset == pytest.approx(32)
+    assert converter.factor == pytest.approx(9 / 5, rel=1e-15)
+    assert ureg.ucum_converter("[degF]", "K").factor == pytest.approx(5 / 9, rel=1e-15)
+    np.testing.assert_allclose(converter(values), [32.0, 33.8, 212.0])
+    np.testing.assert_allclose(
+        ureg.convert_ucum([32.0, 212.0], "[degF]", "Cel"), [0.0, 100.0], atol=1e-12
+    )
+
+    converter = ureg.ucum_converter("B[V]", "V")
+    assert converter.function is not None
+    np.testing.assert_allclose(converter([0.0, 2.0]), [1.0, 10**0.2])
+    expected = ureg.Quantity(values, "km/h").to("m/s").magnitude
+    np.testing.assert_allclose(ureg.convert_ucum(values, "km/h", "m/s"), expected)
+
+
+def test_ucum_unitregistry_converter_incompatible():
+    ureg = PintUcumRegistry()
+    with pytest.raises(DimensionalityError):
+        ureg.ucum_converter("mg/dL", "mmol/L")
+
+
+def test_ucum_unitregistry_convert_column():
+    np = pytest.importorskip("numpy")
+    ureg = PintUcumRegistry(ucum_stats=True)
+    ucum_codes = ["mg/dL", "g/L", "mmol/L", None, "g/dL", "xx", "mg/dL", "B[V]"]
+    values = [100, 1, 5, 1, 2, 3, 50, 1]
+
+    result = ureg.convert_ucum_column(values, np.array(ucum_codes), "g/L")
+    expected = [1.0, 1.0, np.nan, np.nan, 20.0, np.nan, 0.5, np.nan]
+    np.testing.assert_allclose(result.values, expected)
+    assert result.mask.tolist() == [False, False, True, True, False, True, False, True]
+    assert set(result.errors) == {"mmol/L", None, "xx", "B[V]"}
+    assert isinstance(result.errors["mmol/L"], DimensionalityError)
+    assert isinstance(result.errors[None], TypeError)
+    assert isinstance(result.errors["xx"], LarkError)
+    assert ureg.ucum_stats.counters["column_codes"] == len(ucum_codes)
+
+    # offset, logarithmic and annotation-only codes
+    result = ureg.convert_ucum_column([100, 1, 212], ["Cel", "K", "[degF]"], "Cel")
+    np.testing.assert_allclose(result.values, [100.0, -272.15, 100.0])
+    result = ureg.convert_ucum_column([1, 2, 3], ["B[V]", "V", "B[V]"], "V")
+    np.testing.assert_allclose(result.values, [10**0.1, 2.0, 10**0.3])
+    result = ureg.convert_ucum_column([2, 3], ["{rbc}", "%"], "1")
+    np.testing.assert_allclose(result.values, [2.0, 0.03])
+    assert not result.mask.any()
+
+
+def test_ucum_unitregistry_convert_column_invalid_input():
+    pytest.importorskip("numpy")
+    ureg = PintUcumRegistry()
+    with pytest.raises(ValueError, match="2 values but 1 UCUM codes"):
+        ureg.convert_ucum_column([1, 2], ["g"], "kg")
+    with pytest.raises(LarkError):
+        ureg.convert_ucum_column([1], ["g"], "xx")
+
+
+def test_ucum_to_pint_unit_table(ucum_parser, ureg_ucumvert):
+    transformer = UcumToPintTransformer(ureg_ucumvert)
+    q1 = transformer.transform(ucum_parser.parse("mm"))
+    assert ("m", "m") in transformer.unit_table
+    q1.ito("km")  # must not modify the table
+    q2 = transformer.transform(ucum_parser.parse("mm"))
+    assert q2 == ureg_ucumvert("mm")
+    assert q2.units == ureg_ucumvert("mm").units
+
+    transformer.build_unit_table()
+    assert ("k", "g") in transformer.unit_table
+    assert ("[pH]",) not in transformer.unit_table  # not defined in pint
+    result = transformer.transform(ucum_parser.parse("kg.m/s2"))
+    assert result == ureg_ucumvert("kg*m/s**2")
+
+
+def test_ucum_unitregistry_shared_parser():
+    ureg1 = PintUcumRegistry()
+    ureg2 = PintUcumRegistry()
+    assert ureg1._ucum_parser is ureg2._ucum_parser  # noqa: SLF001
+    quantity = ureg1.from_ucum("mg/dL")
+    assert quantity._REGISTRY is ureg1  # noqa: SLF001
+    assert quantity.to("g/L").magnitude == pytest.approx(0.01)
+
+
+def test_ucum_unitregistry_cache_folder(tmp_path):
+    ureg1 = PintUcumRegistry(cache_folder=tmp_path)
+    assert any(tmp_path.iterdir())
+    ureg2 = PintUcumRegistry(cache_folder=tmp_path)  # loaded from the disk cache
+    assert "peripheral_vascular_resistance_unit" in ureg2
+    assert str(ureg2.from_ucum("m[H2O]").units) == str(ureg1.from_ucum("m[H2O]").units)
+
+
+@pytest.mark.parametrize("ucum_engine", ["lalr", "descent"])
+def test_ucum_unitregistry_threads(ucum_engine):
+    codes = [c for c in ucum_examples_valid.values() if c not in ("Torr", "[pH]")]
+    # A small cache makes the threads evict each other's entries.
+    ureg = PintUcumRegistry(ucum_cache_size=16, ucum_engine=ucum_engine)
+    expected = {code: str(ureg.from_ucum(code)) for code in codes[:80]}
+    ureg.ucum_cache_clear()
+
+    def convert(offset):
+        n = len(expected)
+        keys = list(expected)
+        return [
+            (code, str(ureg.from_ucum(code)))
+            for code in (keys[(offset + i) % n] for i in range(3 * n))
+        ]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for results in pool.map(convert, range(16)):
+            for code, result in results:
+                assert result == expected[code]
+    info = ureg.ucum_cache_info()
+    assert info.hits + info.misses == 16 * 3 * len(expected)
+
+
+class CountingParser:
+    def __init__(self, parser):
+        self.parser = parser
+        self.calls = 0
+
+    def parse(self, ucum_code):
+        self.calls += 1
+        return self.parser.parse(ucum_code)
+
+
+def test_ucum_unitregistry_error_cache():
+    ureg = PintUcumRegistry()
+    ureg._ucum_parser = parser = CountingParser(ureg._ucum_parser)  # noqa: SLF001
+    errors = []
+    for _ in range(3):
+        with pytest.raises(UnexpectedCharacters, match="No terminal matches 's'") as e:
+            ureg.from_ucum("bars")
+        errors.append(e.value)
+    assert parser.calls == 1
+    info = ureg.ucum_error_cache_info()
+    assert (info.hits, info.currsize) == (2, 1)
+    # Each caller gets its own copy, the cached exception keeps no traceback.
+    assert len({id(error) for error in errors}) == 3  # noqa: PLR2004
+    assert errors[2].pos_in_stream == errors[0].pos_in_stream
+    assert ureg._ucum_errors.peek("bars").__traceback__ is None  # noqa: SLF001
+
+    result = ureg.from_ucum_many(["bars", "m", "bars"])
+    assert result.error_mask == [True, False, True]
+    assert parser.calls == 2  # only "m" was parsed  # noqa: PLR2004
+
+    ureg.ucum_cache_clear()
+    assert ureg.ucum_error_cache_info().currsize == 0
+
+
+@pytest.mark.parametrize(
+    ("ucum_code", "pos"), [("5 mg", 1), ("mg/dl\n", 5), ("µg", 0), ("Zellen/µl", 7)]
+)
+def test_ucum_unitregistry_rejects_non_ascii(ucum_code, pos):
+    ureg = PintUcumRegistry(ucum_error_cache_size=0)
+    ureg._ucum_parser = parser = CountingParser(ureg._ucum_parser)  # noqa: SLF001
+    with pytest.raises(UnexpectedCharacters) as exc_info:
+        ureg.from_ucum(ucum_code)
+    assert exc_info.value.pos_in_stream == pos
+    assert parser.calls == 0
+
+
+@pytest.mark.parametrize("ucum_engine", ["lalr", "descent"])
+def test_ucum_unitregistry_stats(ucum_engine):
+    ureg = PintUcumRegistry(ucum_engine=ucum_engine, ucum_stats=True)
+    for ucum_code in ("mg/dL", "mg/dL", "bars", "bars", "10*3/uL"):
+        with contextlib.suppress(LarkError):
+            ureg.from_ucum(ucum_code)
+    ureg.from_ucum_many(["mg/dL", "m"])
+    snapshot = ureg.ucum_stats.snapshot()
+    assert snapshot["counters"] == {
+        "calls": 7,
+        "hits": 2,
+        "misses": 4,
+        "errors": 1,
+        "error_cache_hits": 1,
+        "batch_calls": 1,
+        "batch_codes": 2,
+        "parallel_codes": 0,
+    }
+    stages = snapshot["stages"]
+    assert stages["total"]["count"] == 4  # noqa: PLR2004
+    assert stages["pint"]["count"] >= 3  # noqa: PLR2004
+    assert stages["transform"]["total"] <= stages["total"]["total"]
+    assert ("parse" in stages) == (ucum_engine == "lalr")
+    assert sum(stages["total"]["histogram"].values()) == 4  # noqa: PLR2004
+    assert {code for code, _ in snapshot["slowest"]} == {
+        "mg/dL",
+        "bars",
+        "10*3/uL",
+        "m",
+    }
+
+
+def test_ucum_unitregistry_stats_disabled():
+    ureg = PintUcumRegistry()
+    assert ureg.ucum_stats is None
+    ureg.from_ucum("m")
+    ureg.ucum_stats = stats = UcumStats(slowest=1)
+    ureg.ucum_cache_clear()
+    ureg.from_ucum("m")
+    ureg.from_ucum("kg.m/s2")
+    assert stats.counters["misses"] == 2  # noqa: PLR2004
+    assert len(stats.slowest_codes()) == 1
+    ureg.ucum_stats = None
+    ureg.from_ucum("g")
+    assert stats.counters["calls"] == 2  # noqa: PLR2004
+
+
+def test_ucum_preprocessor_stats(ucum_parser):
+    stats = UcumStats()
+    preprocessor = UcumPreprocessor(ucum_parser, stats=stats)
+    preprocessor("m.kg")
+    preprocessor("m.kg")
+    with pytest.raises(LarkError):
+        preprocessor("degC")
+    assert stats.counters == {"calls": 3, "hits": 1, "misses": 2, "errors": 1}
+    assert stats.stages["parse"].count == 2  # noqa: PLR2004
+    assert stats.stages["transform"].count == 1
+
+
+@pytest.fixture(scope="module")
+def ureg_to_ucum():
+    return PintUcumRegistry()
+
+
+@pytest.mark.parametrize(
+    ("pint_unit", "ucum_code"),
+    [
+        ("milligram / deciliter", "mg/dL"),
+        ("kilogram * meter / second ** 2", "kg.m/s2"),
+        ("1 / second", "/s"),
+        ("gram / meter / second ** 2", "g/(m.s2)"),
+        ("degree_Celsius", "Cel"),
+        ("liter", "L"),  # preferred over "l"
+        ("minute", "min"),  # preferred over the mapped "'"
+        ("kilobyte", "kBy"),
+        ("foot", "[ft_i]"),
+        ("dimensionless", "1"),
+    ],
+)
+def test_ucum_unitregistry_to_ucum(ureg_to_ucum, pint_unit, ucum_code):
+    assert ureg_to_ucum.to_ucum(pint_unit) == ucum_code
+    assert ureg_to_ucum.to_ucum(ureg_to_ucum.Unit(pint_unit)) == ucum_code
+
+
+@pytest.mark.parametrize(
+    "ucum_code",
+    ["100.mL", "10*3/uL", "/[HPF]", "[IU]/mL", "umol/L", "m[H2O]", "g/(24.h)", "U/10"],
+)
+def test_ucum_unitregistry_to_ucum_roundtrip(ureg_to_ucum, ucum_code):
+    quantity = ureg_to_ucum.from_ucum(ucum_code)
+    assert ureg_to_ucum.to_ucum(quantity) == ucum_code
+
+
+def test_ucum_unitregistry_to_ucum_official_examples(ureg_to_ucum):
+    for ucum_code in ucum_examples_valid.values():
+        try:
+            quantity = ureg_to_ucum.from_ucum(ucum_code)
+        except LarkError:  # e.g. "[pH]" is not defined in pint
+            continue
+        if not isinstance(quantity, ureg_to_ucum.Quantity):  # only annotations
+            continue
+        try:
+            formatted = ureg_to_ucum.to_ucum(quantity)
+        except ValueError:  # e.g. "g/(1.5.h)", pint units without UCUM code
+            continue
+        assert ureg_to_ucum.from_ucum(formatted) == quantity
+
+
+def test_ucum_unitregistry_to_ucum_errors(ureg_to_ucum):
+    with pytest.raises(ValueError, match="No UCUM code known"):
+        ureg_to_ucum.to_ucum("kilofoot")
+    with pytest.raises(ValueError, match="exponents are integers"):
+        ureg_to_ucum.to_ucum("meter ** 0.5")
+    with pytest.raises(ValueError, match="not expressible"):
+        ureg_to_ucum.to_ucum(ureg_to_ucum.Quantity(2.5, "meter"))
+    ureg_to_ucum.to_ucum("mg")
+    formats = ureg_to_ucum._ucum_formats  # noqa: SLF001
+    assert formats.peek(ureg_to_ucum.Unit("mg")._units) == (("mg",), ())  # noqa: SLF001
+
+
+def test_mapping_report_parallel(tmp_path):
+    serial_file = tmp_path / "serial.txt"
+    parallel_file = tmp_path / "parallel.txt"
+    find_matching_pint_definitions(serial_file)
+    find_matching_pint_definitions(parallel_file, max_workers=2)
+    assert parallel_file.read_text() == serial_file.read_text()
+    assert "# === non-metric ===" in serial_file.read_text()
+
+
+def test_mapping_report_incremental(tmp_path, caplog):
+    report_file = tmp_path / "report.txt"
+    state_file = tmp_path / "report.json"
+    caplog.set_level(logging.INFO, logger="ucumvert.ucum_pint")
+    find_matching_pint_definitions(report_file, incremental=True)
+    assert "Computing 329 of 329" in caplog.text
+    report = report_file.read_text()
+
+    caplog.clear()
+    find_matching_pint_definitions(report_file, incremental=True)
+    assert "Computing 0 of 329" in caplog.text
+    assert report_file.read_text() == report
+
+    # Entries missing from the stored state (e.g. changed inputs) are recomputed.
+    state = json.loads(state_file.read_text())
+    del state[next(iter(state))]
+    state_file.write_text(json.dumps(state))
+    caplog.clear()
+    find_matching_pint_definitions(report_file, incremental=True)
+    assert "Computing 1 of 329" in caplog.text
+    assert report_file.read_text() == report
@@ -1,6 +1,28 @@
-from ucumvert.xml_util import get_metric_units, get_non_metric_units, get_units
+import pytest
+
+import ucumvert
+from ucumvert.xml_util import (
+    get_metric_units,
+    get_non_metric_units,
+    get_prefixes,
+    get_units,
+)
 
 
 def test_get_units():
     assert len(get_units()) == 305  # noqa: PLR2004
     assert set(get_units()) == set(get_metric_units() + get_non_metric_units())
+
+
+@pytest.mark.parametrize(
+    "get_codes", [get_prefixes, get_units, get_metric_units, get_non_metric_units]
+)
+def test_code_attrib_argument(get_codes, monkeypatch):
+    assert get_codes("Code") == get_codes()
+    nocase = get_codes("CODE")
+    assert nocase != get_codes()
+    # The argument gives the same codes as setting the global CODE_ATTRIB ...
+    monkeypatch.setattr(ucumvert.xml_util, "CODE_ATTRIB", "CODE")
+    assert get_codes() == nocase
+    # ... and takes precedence over it.
+    assert get_codes("Code") != nocase